@@ -8,9 +8,10 @@ import os
 from datetime import datetime
 
 # Import routes
-from routes.analyze import analyze_bp
-from routes.upload import upload_bp
-from routes.export import export_bp
+from .routes.analyze import analyze_bp
+from .routes.upload import upload_bp
+from .routes.export import export_bp
+from .nlp._registry import preload as preload_models
 
 # Load environment variables
 load_dotenv()
@@ -24,12 +25,27 @@ CORS(app)  # Enable CORS for frontend requests
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOAD_FOLDER'] = 'data/uploads'
 app.config['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY')
+app.config['GROQ_API_KEY'] = os.getenv('GROQ_API_KEY')
+
+# Checked once at startup; without a key the LLM modules use rule-based fallbacks
+if not app.config['GROQ_API_KEY']:
+    print("GROQ_API_KEY not set - explanations and LLM scoring will use fallbacks")
+
+# Create necessary directories
+os.makedirs('data/uploads', exist_ok=True)
+os.makedirs('data/audit_logs', exist_ok=True)
 
 # Register blueprints
 app.register_blueprint(analyze_bp, url_prefix='/api/analyze')
 app.register_blueprint(upload_bp, url_prefix='/api/upload')
 app.register_blueprint(export_bp, url_prefix='/api/export')
 
+# Load the spaCy model and NLP components once per worker, before the first request.
+# PDF pool processes re-import this module as __mp_main__ under python -m backend.app
+# and need none of them
+if __name__ != '__mp_main__':
+    preload_models()
+
 @app.route('/')
 def index():
     """Serve the frontend"""
@@ -56,9 +72,9 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error occurred.'}), 500
 
 if __name__ == '__main__':
-    # Create necessary directories
-    os.makedirs('data/uploads', exist_ok=True)
-    os.makedirs('data/audit_logs', exist_ok=True)
-    
-    # Run the app
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server only; production runs under Gunicorn via wsgi.py
+    debug = os.getenv('FLASK_DEBUG', '1') == '1'
+    if debug:
+        app.run(debug=True, host='0.0.0.0', port=5000)
+    else:
+        print("Run under Gunicorn: gunicorn -k gthread --workers $(nproc) --threads 16 --timeout 120 backend.wsgi:app")
@@ -0,0 +1,127 @@
+"""
+LLM Response Cache - Reuse chat completions for identical prompts
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional
+import hashlib
+import json
+import threading
+
+import diskcache
+
+CACHE_DIR = 'data/llm_cache'
+CACHE_TTL = 7 * 86400  # seconds
+MEMORY_CACHE_SIZE = 4096
+
+_memory: 'OrderedDict[str, str]' = OrderedDict()
+_memory_lock = threading.Lock()
+_disk: Optional[diskcache.Cache] = None
+
+def chat_completion(client, model: str, messages: List[Dict], **params) -> str:
+    """
+    Return the content of a chat completion, served from cache when the same
+    model, messages and sampling parameters were requested before
+    """
+    key = cache_key(model, messages, params)
+
+    content = get(key)
+    if content is not None:
+        return content
+
+    response = client.chat.completions.create(model=model, messages=messages, **params)
+    choice = response.choices[0]
+    content = choice.message.content
+
+    # A response cut off at max_tokens is returned but not cached
+    if content and choice.finish_reason == 'stop':
+        put(key, content)
+    return content
+
+def chat_completion_stream(client, model: str, messages: List[Dict],
+                           until: Optional[Callable[[str], bool]] = None, **params) -> Iterator[str]:
+    """
+    Stream a chat completion as content deltas
+    
+    A cached completion is yielded as a single delta. The text is cached once
+    the model finishes normally (finish_reason 'stop'), or as soon as
+    until(text_so_far) returns True, in which case the rest of the response is
+    not read. Empty, truncated or interrupted responses are not cached.
+    """
+    key = cache_key(model, messages, params)
+
+    content = get(key)
+    if content is not None:
+        yield content
+        return
+
+    stream = client.chat.completions.create(model=model, messages=messages, stream=True, **params)
+    parts = []
+    complete = False
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.finish_reason is not None:
+                complete = choice.finish_reason == 'stop'
+
+            delta = choice.delta.content
+            if not delta:
+                continue
+
+            parts.append(delta)
+            yield delta
+
+            if until is not None and until(''.join(parts)):
+                complete = True
+                break
+    finally:
+        close = getattr(stream, 'close', None)
+        if close:
+            close()
+
+    if complete and parts:
+        put(key, ''.join(parts))
+
+def cache_key(model: str, messages: List[Dict], params: Dict) -> str:
+    """Content-addressed key over everything that affects the completion"""
+    payload = json.dumps([model, messages, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def get(key: str) -> Optional[str]:
+    """Look up a cached completion, memory first, then disk"""
+    with _memory_lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return _memory[key]
+
+    try:
+        content = _disk_cache().get(key)
+    except Exception as e:
+        print(f"LLM cache read failed: {e}")
+        return None
+
+    if content is not None:
+        _remember(key, content)
+    return content
+
+def put(key: str, content: str):
+    """Store a completion in memory and on disk"""
+    _remember(key, content)
+    try:
+        _disk_cache().set(key, content, expire=CACHE_TTL)
+    except Exception as e:
+        print(f"LLM cache write failed: {e}")
+
+def _remember(key: str, content: str):
+    with _memory_lock:
+        _memory[key] = content
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_CACHE_SIZE:
+            _memory.popitem(last=False)
+
+def _disk_cache() -> diskcache.Cache:
+    global _disk
+    if _disk is None:
+        _disk = diskcache.Cache(CACHE_DIR)
+    return _disk
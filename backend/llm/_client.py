@@ -0,0 +1,40 @@
+"""
+Groq Client - One client and connection pool shared by every LLM caller
+"""
+from typing import Optional
+import os
+import threading
+
+import httpx
+from groq import Groq
+
+# Connection pool sized for concurrent clause scoring across request threads
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 50
+
+_client: Optional[Groq] = None
+_client_lock = threading.Lock()
+
+def get_groq_client() -> Optional[Groq]:
+    """
+    Return the process-wide Groq client, or None when GROQ_API_KEY is not set
+    
+    Created on first use (after .env is loaded) so keep-alive connections are
+    reused by Explainer and RiskScorer instead of a new TLS handshake per instance.
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    api_key = os.getenv('GROQ_API_KEY')
+    if not api_key:
+        return None
+
+    with _client_lock:
+        if _client is None:
+            http_client = httpx.Client(limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS
+            ))
+            _client = Groq(api_key=api_key, http_client=http_client)
+        return _client
@@ -0,0 +1,104 @@
+"""
+Clause Batcher - Coalesce concurrent clause explanation requests into batched LLM calls
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import queue
+import threading
+import time
+
+from .explainer import Explainer
+
+class ClauseExplanationBatcher:
+    """Collect explain_clause requests arriving within a short window and send them as one prompt"""
+
+    def __init__(self, explainer: Explainer, max_batch: int = 32, max_wait_ms: int = 10, max_workers: int = 4):
+        self.explainer = explainer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        # Batches run concurrently so a slow LLM call does not hold up the next window
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='clause-batch')
+        self._worker = threading.Thread(target=self._run, name='clause-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, clause_text: str, risk_info: Dict) -> Dict:
+        """
+        Queue a clause for explanation and block until its batch completes
+
+        Returns:
+            Same structure as Explainer.explain_clause
+        """
+        cached = self.explainer.cached_clause_explanation(clause_text, risk_info)
+        if cached is not None:
+            return cached
+
+        request = _PendingExplanation(clause_text, risk_info)
+        self._queue.put(request)
+        request.done.wait()
+        return request.result
+
+    def _run(self):
+        """Worker loop: drain the queue into batches of up to max_batch requests"""
+        while True:
+            self._pool.submit(self._process_batch, self._collect_batch())
+
+    def _process_batch(self, batch: List['_PendingExplanation']):
+        """Explain one batch and wake every request waiting on it"""
+        try:
+            if len(batch) == 1:
+                results = [self.explainer.explain_clause(batch[0].clause_text, batch[0].risk_info)]
+            else:
+                results = self.explainer.explain_clauses_batch(
+                    [{'text': r.clause_text} for r in batch],
+                    [r.risk_info for r in batch]
+                )
+        except Exception as e:
+            print(f"Clause batch failed: {e}")
+            results = []
+
+        for i, request in enumerate(batch):
+            if i < len(results):
+                request.result = results[i]
+            else:
+                request.result = self.explainer._generate_fallback_clause_explanation(request.clause_text, request.risk_info)
+            request.done.set()
+
+    def _collect_batch(self) -> List['_PendingExplanation']:
+        """Wait for the first request, then gather more until the window closes or the batch is full"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+class _PendingExplanation:
+    """A queued clause explanation waiting for its batch"""
+
+    __slots__ = ('clause_text', 'risk_info', 'result', 'done')
+
+    def __init__(self, clause_text: str, risk_info: Dict):
+        self.clause_text = clause_text
+        self.risk_info = risk_info
+        self.result = None
+        self.done = threading.Event()
+
+_batcher: Optional[ClauseExplanationBatcher] = None
+_batcher_lock = threading.Lock()
+
+def get_clause_batcher() -> ClauseExplanationBatcher:
+    """Return the process-wide clause explanation batcher, starting it on first use"""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = ClauseExplanationBatcher(Explainer())
+        return _batcher
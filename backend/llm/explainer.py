@@ -1,16 +1,53 @@
 """
 Explainer - Generate plain-language explanations
 """
-from typing import Dict, List
-import os
-from groq import Groq
+from typing import Dict, Iterator, List, Optional
+import json
+
+from ._cache import cache_key, chat_completion, chat_completion_stream, get as cache_get
+from ._client import get_groq_client
+from .risk_scorer import RiskScorer
+
+# Short, stable codes for the risk pattern flags (e.g. uncapped_liability -> ul)
+FLAG_CODES = {name: ''.join(word[0] for word in name.split('_')) for name in RiskScorer._RISK_PATTERNS}
+# Initials can collide as patterns are added; two flags must never share a code
+if len(set(FLAG_CODES.values())) != len(FLAG_CODES):
+    raise ValueError(f"Duplicate risk flag codes: {FLAG_CODES}")
+
+# Sent once per request as the system message; the user message only carries the JSON payload
+CONTRACT_SUMMARY_SYSTEM_PROMPT = """You are a legal advisor helping Indian SMEs understand contracts. Use simple business language, avoid legal jargon.
+
+You receive a JSON summary of one analyzed contract:
+type = contract type, n_clauses = total clauses, risk = score out of 100, level = overall risk level,
+high = ids of high-risk clauses (n_high in total), flags = risk flags found, each {t: code, n: count, d: description if t is not a code}.
+
+Flag codes:
+""" + "\n".join(
+    f"{FLAG_CODES[name]} = {info['description']}" for name, info in RiskScorer._RISK_PATTERNS.items()
+) + """
+
+Provide:
+1. Executive summary (2-3 sentences)
+2. Top 3 concerns for SME
+3. Top 3 recommendations"""
 
 class Explainer:
     """Generate SME-friendly explanations of contract terms"""
     
+    # Output budget per clause for batched explanations (capped per request)
+    BATCH_TOKENS_PER_CLAUSE = 400
+    BATCH_MAX_TOKENS = 8000
+    
+    # Single clause explanations (part of the cache key, see cached_clause_explanation)
+    CLAUSE_MODEL = "llama-3.3-70b-versatile"
+    CLAUSE_PARAMS = {'temperature': 0.5, 'max_tokens': 500}
+    
+    # Contract summary payload limits
+    SUMMARY_MAX_CLAUSE_IDS = 10
+    FLAG_DESCRIPTION_MAX_CHARS = 80
+    
     def __init__(self):
-        api_key = os.getenv('GROQ_API_KEY')
-        self.client = Groq(api_key=api_key) if api_key else None
+        self.client = get_groq_client()
     
     def explain_contract(self, contract_type: str, clauses: List[Dict], risk_analysis: Dict) -> Dict:
         """
@@ -20,38 +57,14 @@ class Explainer:
             return self._generate_fallback_summary(contract_type, clauses, risk_analysis)
         
         try:
-            # Prepare high-risk clauses for focus
-            high_risk_clauses = [c for c in clauses if c.get('risk_level') == 'high']
-            
-            prompt = f"""Summarize this {contract_type} contract for a small business owner in India.
-
-Contract Overview:
-- Total Clauses: {len(clauses)}
-- Risk Score: {risk_analysis['composite_score']}/100 ({risk_analysis['risk_level']})
-- High-Risk Clauses: {len(high_risk_clauses)}
-
-High-Risk Areas:
-{self._format_risk_flags(risk_analysis['flags'])}
-
-Provide:
-1. Executive summary (2-3 sentences)
-2. Top 3 concerns for SME
-3. Top 3 recommendations
-
-Use simple business language, avoid legal jargon."""
-
-            response = self.client.chat.completions.create(
+            explanation = chat_completion(
+                self.client,
                 model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": "You are a legal advisor helping Indian SMEs understand contracts. Use simple, clear language."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._contract_messages(contract_type, clauses, risk_analysis),
                 temperature=0.5,
                 max_tokens=600
             )
             
-            explanation = response.choices[0].message.content
-            
             return {
                 'summary': explanation,
                 'recommendations': self._extract_recommendations(explanation)
@@ -61,6 +74,60 @@ Use simple business language, avoid legal jargon."""
             print(f"Contract explanation failed: {e}")
             return self._generate_fallback_summary(contract_type, clauses, risk_analysis)
     
+    def stream_contract_explanation(self, contract_type: str, clauses: List[Dict], risk_analysis: Dict) -> Iterator[Dict]:
+        """
+        Stream the contract summary as it is generated
+        
+        Yields:
+            {'delta': text} for each piece of the summary, then a final
+            {'summary': ..., 'recommendations': [...]} built from the full text
+        """
+        if not self.client:
+            yield self._generate_fallback_summary(contract_type, clauses, risk_analysis)
+            return
+        
+        parts = []
+        try:
+            for delta in chat_completion_stream(
+                self.client,
+                model="llama-3.3-70b-versatile",
+                messages=self._contract_messages(contract_type, clauses, risk_analysis),
+                temperature=0.5,
+                max_tokens=600
+            ):
+                parts.append(delta)
+                yield {'delta': delta}
+        except Exception as e:
+            print(f"Contract explanation stream failed: {e}")
+            if not parts:
+                yield self._generate_fallback_summary(contract_type, clauses, risk_analysis)
+                return
+        
+        explanation = ''.join(parts)
+        yield {
+            'summary': explanation,
+            'recommendations': self._extract_recommendations(explanation)
+        }
+    
+    def _contract_messages(self, contract_type: str, clauses: List[Dict], risk_analysis: Dict) -> List[Dict]:
+        """Build the chat messages for the contract summary (fixed system prompt + compact JSON payload)"""
+        high_risk_ids = [c.get('id') for c in clauses if c.get('risk_level') == 'high']
+        
+        payload = {
+            'type': contract_type,
+            'n_clauses': len(clauses),
+            'risk': risk_analysis['composite_score'],
+            'level': risk_analysis['risk_level'],
+            'high': high_risk_ids[:self.SUMMARY_MAX_CLAUSE_IDS],
+            'n_high': len(high_risk_ids),
+            'flags': self._compact_flags(risk_analysis['flags'])
+        }
+        
+        return [
+            {"role": "system", "content": CONTRACT_SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps(payload, separators=(',', ':'), ensure_ascii=False)}
+        ]
+    
     def generate_contract_template(self, contract_type: str, requirements: str = "") -> str:
         """
         Generate a standardized SME-friendly contract template
@@ -86,7 +153,8 @@ Structure:
 
 Make it simple, balanced, and compliant with Indian Contract Act 1872. Use clear headings and [placeholders] for variable info."""
 
-            response = self.client.chat.completions.create(
+            return chat_completion(
+                self.client,
                 model="llama-3.3-70b-versatile",
                 messages=[
                     {"role": "system", "content": "You are a legal expert creating balanced contract templates for Indian SMEs."},
@@ -96,8 +164,6 @@ Make it simple, balanced, and compliant with Indian Contract Act 1872. Use clear
                 max_tokens=1500
             )
             
-            return response.choices[0].message.content
-            
         except Exception as e:
             print(f"Template generation failed: {e}")
             return "Error generating template. Please try again."
@@ -110,7 +176,30 @@ Make it simple, balanced, and compliant with Indian Contract Act 1872. Use clear
             return self._generate_fallback_clause_explanation(clause_text, risk_info)
         
         try:
-            prompt = f"""Explain this contract clause to a small business owner:
+            explanation = chat_completion(
+                self.client,
+                model=self.CLAUSE_MODEL,
+                messages=self._clause_messages(clause_text, risk_info),
+                **self.CLAUSE_PARAMS
+            )
+            return self._clause_result(explanation)
+            
+        except Exception as e:
+            print(f"Clause explanation failed: {e}")
+            return self._generate_fallback_clause_explanation(clause_text, risk_info)
+    
+    def cached_clause_explanation(self, clause_text: str, risk_info: Dict) -> Optional[Dict]:
+        """Return the explain_clause result if it is already cached, without calling the LLM"""
+        if not self.client:
+            return None
+        
+        key = cache_key(self.CLAUSE_MODEL, self._clause_messages(clause_text, risk_info), self.CLAUSE_PARAMS)
+        explanation = cache_get(key)
+        return self._clause_result(explanation) if explanation else None
+    
+    def _clause_messages(self, clause_text: str, risk_info: Dict) -> List[Dict]:
+        """Chat messages for a single clause explanation"""
+        prompt = f"""Explain this contract clause to a small business owner:
 
 Clause: {clause_text}
 
@@ -124,34 +213,119 @@ Provide:
 
 Keep it concise and practical."""
 
-            response = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": "You are a legal advisor simplifying contract terms for Indian SMEs."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.5,
-                max_tokens=500
-            )
-            
-            explanation = response.choices[0].message.content
+        return [
+            {"role": "system", "content": "You are a legal advisor simplifying contract terms for Indian SMEs."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _clause_result(self, explanation: str) -> Dict:
+        return {
+            'plain_language': explanation,
+            'concerns': self._extract_concerns(explanation),
+            'alternatives': self._extract_alternatives(explanation)
+        }
+    
+    def explain_clauses_batch(self, clauses: List[Dict], risk_infos: List[Dict]) -> List[Dict]:
+        """
+        Generate plain-language explanations for several clauses with a single LLM call
+        
+        Returns:
+            List of explanation dicts, in the same order as clauses
+        """
+        if not clauses:
+            return []
+        
+        if not self.client:
+            return [self._generate_fallback_clause_explanation(c['text'], r) for c, r in zip(clauses, risk_infos)]
+        
+        try:
+            items = self._parse_json_array(self._call_groq_batch(clauses, risk_infos))
+        except Exception as e:
+            print(f"Batch clause explanation failed: {e}")
+            items = []
+        
+        results = []
+        for i, (clause, risk_info) in enumerate(zip(clauses, risk_infos)):
+            item = items[i] if i < len(items) and isinstance(items[i], dict) else None
+            if not item or not item.get('explanation'):
+                results.append(self._generate_fallback_clause_explanation(clause['text'], risk_info))
+                continue
             
-            return {
+            explanation = item['explanation']
+            results.append({
                 'plain_language': explanation,
-                'concerns': self._extract_concerns(explanation),
-                'alternatives': self._extract_alternatives(explanation)
-            }
-            
-        except Exception as e:
-            print(f"Clause explanation failed: {e}")
-            return self._generate_fallback_clause_explanation(clause_text, risk_info)
+                'concerns': item.get('concerns') or self._extract_concerns(explanation),
+                'alternatives': item.get('alternatives') or self._extract_alternatives(explanation)
+            })
+        
+        return results
     
-    def _format_risk_flags(self, flags: List[Dict]) -> str:
-        """Format risk flags for prompt"""
-        if not flags:
-            return "No major risk flags detected"
+    def _call_groq_batch(self, clauses: List[Dict], risk_infos: List[Dict]) -> str:
+        """Send one prompt enumerating all clauses and return the raw response"""
+        sections = "\n\n".join(
+            f"Clause {i}:\n{clause['text']}\nRisk Level: {risk_info.get('level', 'medium')}"
+            for i, (clause, risk_info) in enumerate(zip(clauses, risk_infos), 1)
+        )
+        
+        prompt = f"""Explain each of these {len(clauses)} contract clauses to a small business owner:
+
+{sections}
+
+For every clause provide:
+1. What it means in simple terms and why it matters for SMEs
+2. Potential concerns
+3. Alternative wording suggestion (if concerning)
+
+Respond with a JSON array containing exactly one object per clause, in the same order:
+[
+  {{
+    "explanation": "Plain-language explanation",
+    "concerns": ["concern1", "concern2"],
+    "alternatives": ["alternative wording"]
+  }}
+]"""
+
+        return chat_completion(
+            self.client,
+            model="llama-3.3-70b-versatile",
+            messages=[
+                {"role": "system", "content": "You are a legal advisor simplifying contract terms for Indian SMEs. Respond only with valid JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.5,
+            max_tokens=min(self.BATCH_TOKENS_PER_CLAUSE * len(clauses), self.BATCH_MAX_TOKENS)
+        )
+    
+    def _parse_json_array(self, text: str) -> List:
+        """Parse a JSON array from an LLM response, ignoring any surrounding prose"""
+        start = text.find('[')
+        end = text.rfind(']')
+        if start == -1 or end < start:
+            return []
+        
+        result = json.loads(text[start:end + 1])
+        return result if isinstance(result, list) else []
+    
+    def _compact_flags(self, flags: List[Dict]) -> List[Dict]:
+        """Collapse risk flags to one entry per type, using legend codes instead of descriptions"""
+        compact = {}
+        for flag in flags:
+            code = FLAG_CODES.get(flag['type'])
+            if code is None:
+                # Not in the legend (e.g. LLM concerns): keep a short description
+                key = (flag['type'], flag['description'][:self.FLAG_DESCRIPTION_MAX_CHARS])
+                entry = {'t': flag['type'], 'd': key[1]}
+            else:
+                key = code
+                entry = {'t': code}
+            
+            if key in compact:
+                compact[key]['n'] += 1
+            else:
+                entry['n'] = 1
+                compact[key] = entry
         
-        return "\n".join([f"- {flag['type']}: {flag['description']}" for flag in flags[:5]])
+        return list(compact.values())
     
     def _extract_recommendations(self, text: str) -> List[str]:
         """Extract recommendations from LLM response"""
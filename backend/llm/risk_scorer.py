@@ -1,30 +1,135 @@
 """
 Risk Scorer - Assess contract and clause-level risks
 """
-from typing import Dict, List
-import os
-from groq import Groq
+from concurrent.futures import Executor, ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Dict, List, Optional
+import asyncio
+import json
+import numpy as np
+
+from ..nlp.byte_automaton import ByteAutomaton, NUMBA_AVAILABLE
+from ..nlp.keyword_matcher import KeywordMatcher
+from ._cache import chat_completion_stream
+from ._client import get_groq_client
+
+def _composite_kernel(scores: np.ndarray, weights: np.ndarray) -> float:
+    """Weighted mean of the clause scores"""
+    total = 0.0
+    weight_sum = 0.0
+    for i in range(scores.shape[0]):
+        total += scores[i] * weights[i]
+        weight_sum += weights[i]
+    return total / weight_sum
+
+if NUMBA_AVAILABLE:
+    import numba
+    # Serial: a contract has at most a few hundred clauses, too few to pay for threads
+    _composite_kernel = numba.njit(cache=True)(_composite_kernel)
 
 class RiskScorer:
     """Score risk levels for contracts and clauses"""
     
+    # Every table below is shared; an instance only holds references to them
+    __slots__ = ('client', 'clause_weights', 'risk_patterns', '_matcher', '_byte_automaton')
+    
     # Risk thresholds
     HIGH_RISK_THRESHOLD = 70
     MEDIUM_RISK_THRESHOLD = 40
     
-    def __init__(self):
-        api_key = os.getenv('GROQ_API_KEY')
-        self.client = Groq(api_key=api_key) if api_key else None
-        
-        # Risk weights for clause types
-        self.clause_weights = {
-            'prohibition': 1.2,
-            'obligation': 1.0,
-            'condition': 0.8,
-            'right': 0.6,
-            'definition': 0.3,
-            'general': 0.5
+    # Level i covers scores from _LEVEL_BOUNDS[i - 1] up to _LEVEL_BOUNDS[i]
+    _LEVELS = ('low', 'medium', 'high')
+    _LEVEL_BOUNDS = np.array([MEDIUM_RISK_THRESHOLD, HIGH_RISK_THRESHOLD], dtype=np.float32)
+    
+    # Maximum in-flight LLM requests per contract
+    LLM_CONCURRENCY_LIMIT = 20
+    
+    # Contracts with at least this many clauses are scanned in one compiled batch
+    BATCH_SCAN_MIN_CLAUSES = 64
+    
+    # Risk patterns with weights
+    _RISK_PATTERNS = {
+        'unilateral_termination': {
+            'keywords': ['may terminate', 'right to terminate', 'terminate at will', 'terminate without cause', 'sole discretion'],
+            'weight': 30,
+            'description': 'One-sided termination rights (may be void per Indian Contract Act if arbitrary)'
+        },
+        'uncapped_liability': {
+            'keywords': ['unlimited liability', 'no limit', 'without limitation', 'liable for all', 'indemnify against all'],
+            'weight': 35,
+            'description': 'Unlimited liability exposure'
+        },
+        'auto_renewal_lock_in': {
+            'keywords': ['automatically renew', 'auto-renewal', 'lock-in period', 'cannot terminate during'],
+            'weight': 20,
+            'description': 'Auto-renewal or Lock-in period (check if > 3 years)'
+        },
+        'penalty_high': {
+            'keywords': ['penalty', 'liquidated damages', 'forfeit', 'pay as damages'],
+            'weight': 25,
+            'description': 'Penalty clause (Indian courts distinguish between reasonable compensation and penalty)'
+        },
+        'non_compete_excessive': {
+            'keywords': ['non-compete', 'shall not compete', 'restrictive covenant', 'after termination'],
+            'weight': 30,
+            'description': 'Post-termination non-compete (Often void in India under Sec 27 unless reasonable)'
+        },
+        'ip_transfer': {
+            'keywords': ['transfer of intellectual property', 'ip rights transfer', 'ownership of all work', 'work for hire'],
+            'weight': 25,
+            'description': 'Intellectual property transfer'
+        },
+        'foreign_jurisdiction': {
+            'keywords': ['courts of singapore', 'courts of london', 'exclusive jurisdiction of', 'outside india'],
+            'weight': 40,
+            'description': 'Foreign Jurisdiction (High cost/risk for Indian SME)'
+        },
+        'arbitration_cost': {
+            'keywords': ['arbitration in london', 'singapore international arbitration', 'icc rules'],
+            'weight': 35,
+            'description': 'High-cost International Arbitration'
+        },
+        'ambiguous_terms': {
+            'keywords': ['reasonable', 'best efforts', 'as soon as possible', 'appropriate'],
+            'weight': 10,
+            'description': 'Ambiguous or vague terms'
         }
+    }
+    
+    # Flat (name, weight, description) rows in pattern order for scoring
+    _PATTERN_TABLE = tuple((name, info['weight'], info['description']) for name, info in _RISK_PATTERNS.items())
+    _PATTERN_WEIGHTS = np.array([weight for _, weight, _ in _PATTERN_TABLE], dtype=np.int64)
+    
+    # Each pattern is one bit of a clause's int64 mask (bit j = _PATTERN_TABLE[j])
+    _PATTERN_BITS = {name: 1 << j for j, (name, _, _) in enumerate(_PATTERN_TABLE)}
+    _PATTERN_SHIFTS = np.arange(len(_PATTERN_TABLE), dtype=np.int64)
+    
+    # Patterns weighted 25 or more are high risk and reported as flags
+    _FLAGGED_MASK = sum(1 << j for j, (_, weight, _) in enumerate(_PATTERN_TABLE) if weight >= 25)
+    _FLAGS = tuple({'type': name, 'description': description} for name, _, description in _PATTERN_TABLE)
+    
+    # Built once per process; every scorer shares the same automata
+    _MATCHER = KeywordMatcher({name: info['keywords'] for name, info in _RISK_PATTERNS.items()})
+    _BYTE_AUTOMATON = ByteAutomaton(
+        {name: info['keywords'] for name, info in _RISK_PATTERNS.items()}
+    ) if NUMBA_AVAILABLE else None
+    
+    # Risk weights for clause types (read-only)
+    _CLAUSE_WEIGHTS = MappingProxyType({
+        'prohibition': 1.2,
+        'obligation': 1.0,
+        'condition': 0.8,
+        'right': 0.6,
+        'definition': 0.3,
+        'general': 0.5
+    })
+    
+    def __init__(self):
+        self.client = get_groq_client()
+        self.clause_weights = self._CLAUSE_WEIGHTS
+        self.risk_patterns = self._RISK_PATTERNS
+        self._matcher = self._MATCHER
+        self._byte_automaton = self._BYTE_AUTOMATON
     
     def score_contract(self, contract_type: str, clauses: List[Dict]) -> Dict:
         """
@@ -33,81 +138,135 @@ class RiskScorer:
         Returns:
             Dict with composite_score, risk_level, and flags
         """
-        clause_scores = []
+        return self._aggregate_scores(clauses, self.score_clauses(clauses, contract_type))
+    
+    def score_clauses(self, clauses: List[Dict], contract_type: str) -> List[Dict]:
+        """
+        Score many clauses at once
+        
+        The clauses are scanned for risk keywords in one batch into one pattern
+        bitmask per clause, and scored together as a (clauses x patterns)
+        presence matrix.
+        
+        Args:
+            clauses: Dicts with 'text' (and optionally 'text_lower')
+            contract_type: Contract type
+        
+        Returns:
+            One score_clause result per clause, in order
+        """
+        if not clauses:
+            return []
+        
+        masks = self._pattern_masks([self._clause_lower(clause) for clause in clauses])
+        presence = (masks[:, None] >> self._PATTERN_SHIFTS) & 1
+        scores = np.minimum(presence @ self._PATTERN_WEIGHTS, 100)
+        
+        levels = np.searchsorted(self._LEVEL_BOUNDS, scores, side='right')
+        
+        results = []
+        for score, level, flagged in zip(scores.tolist(), levels.tolist(), (masks & self._FLAGGED_MASK).tolist()):
+            results.append({
+                'score': score,
+                'level': self._LEVELS[level],
+                'flags': self._expand_flags(flagged) if flagged else []
+            })
+        return results
+    
+    def _pattern_masks(self, texts: List[str]) -> np.ndarray:
+        """int64 pattern bitmask per text (see _PATTERN_BITS)"""
+        if self._byte_automaton is not None and len(texts) >= self.BATCH_SCAN_MIN_CLAUSES:
+            # ByteAutomaton groups follow _RISK_PATTERNS order, so its masks use the same bits
+            return self._byte_automaton.scan(texts)
+        
+        bits = self._PATTERN_BITS
+        masks = np.zeros(len(texts), dtype=np.int64)
+        for i, hits in enumerate(self._matcher.find_many(texts)):
+            mask = 0
+            for pattern_name in hits:
+                mask |= bits[pattern_name]
+            masks[i] = mask
+        return masks
+    
+    def _expand_flags(self, mask: int) -> List[Dict]:
+        """Flag dicts for the set bits of mask, in pattern order"""
+        return [dict(flag) for j, flag in enumerate(self._FLAGS) if mask >> j & 1]
+    
+    async def score_contract_async(self, contract_type: str, clauses: List[Dict],
+                                   concurrency_limit: Optional[int] = None) -> Dict:
+        """
+        Score every clause with the LLM concurrently, bounded by concurrency_limit
+        
+        Returns:
+            Same structure as score_contract
+        """
+        limit = concurrency_limit or self.LLM_CONCURRENCY_LIMIT
+        semaphore = asyncio.Semaphore(limit)
+        
+        with ThreadPoolExecutor(max_workers=limit) as executor:
+            async def bounded(clause_text: str) -> Dict:
+                async with semaphore:
+                    return await self._score_clause_llm_async(clause_text, contract_type, executor)
+            
+            results = await asyncio.gather(*(bounded(clause['text']) for clause in clauses))
+        
+        return self._aggregate_scores(clauses, results)
+    
+    async def _score_clause_llm_async(self, clause_text: str, contract_type: str,
+                                      executor: Optional[Executor] = None) -> Dict:
+        """Run the blocking LLM call in a worker thread so requests overlap"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.score_clause_with_llm, clause_text, contract_type)
+    
+    def _aggregate_scores(self, clauses: List[Dict], results: List[Dict]) -> Dict:
+        """Attach per-clause results and compute the composite contract score"""
+        scores = np.empty(len(clauses), dtype=np.float32)
         risk_flags = []
         
-        # Score each clause
-        for clause in clauses:
-            risk_result = self.score_clause(clause['text'], contract_type)
+        for i, (clause, risk_result) in enumerate(zip(clauses, results)):
             clause['risk_score'] = risk_result['score']
             clause['risk_level'] = risk_result['level']
-            clause_scores.append(risk_result['score'])
+            scores[i] = risk_result['score']
             
             # Collect high-risk flags
             if risk_result['level'] == 'high':
                 risk_flags.extend(risk_result['flags'])
         
-        # Calculate weighted composite score
-        if clause_scores:
-            composite_score = sum(clause_scores) / len(clause_scores)
+        # Calculate weighted composite score (every clause currently counts equally)
+        if len(scores):
+            weights = np.ones(len(scores), dtype=np.float32)
+            composite_score = float(_composite_kernel(scores, weights))
         else:
             composite_score = 0
         
-        # Determine risk level
-        if composite_score >= self.HIGH_RISK_THRESHOLD:
-            risk_level = 'high'
-        elif composite_score >= self.MEDIUM_RISK_THRESHOLD:
-            risk_level = 'medium'
-        else:
-            risk_level = 'low'
-        
         return {
             'composite_score': round(composite_score, 2),
-            'risk_level': risk_level,
+            'risk_level': self._risk_level(composite_score),
             'flags': risk_flags,
             'clause_count': len(clauses),
             'high_risk_clauses': sum(1 for c in clauses if c.get('risk_level') == 'high')
         }
     
-    def score_clause(self, clause_text: str, contract_type: str) -> Dict:
+    def score_clause(self, clause_text: str, contract_type: str, clause_lower: Optional[str] = None) -> Dict:
         """
         Score risk for individual clause
         
+        Args:
+            clause_text: Clause text
+            contract_type: Contract type
+            clause_lower: Precomputed clause_text.lower(), if the caller already has it
+        
         Returns:
             Dict with score (0-100), level (low/medium/high), and flags
         """
-        clause_lower = clause_text.lower()
-        score = 0
-        flags = []
-        
-        # Pattern-based risk detection
-        risk_patterns = self._get_risk_patterns()
-        
-        for pattern_name, pattern_info in risk_patterns.items():
-            if any(keyword in clause_lower for keyword in pattern_info['keywords']):
-                score += pattern_info['weight']
-                if pattern_info['weight'] >= 25:  # High risk patterns
-                    flags.append({
-                        'type': pattern_name,
-                        'description': pattern_info['description']
-                    })
-        
-        # Cap score at 100
-        score = min(score, 100)
-        
-        # Determine level
-        if score >= self.HIGH_RISK_THRESHOLD:
-            level = 'high'
-        elif score >= self.MEDIUM_RISK_THRESHOLD:
-            level = 'medium'
-        else:
-            level = 'low'
-        
-        return {
-            'score': score,
-            'level': level,
-            'flags': flags
-        }
+        return self.score_clauses([{'text': clause_text, 'text_lower': clause_lower}], contract_type)[0]
+    
+    def _clause_lower(self, clause: Dict) -> str:
+        """Lowercased clause text, reusing the copy cached by ClauseExtractor"""
+        return clause.get('text_lower') or clause['text'].lower()
+    
+    def _risk_level(self, score: float) -> str:
+        return self._LEVELS[int(np.searchsorted(self._LEVEL_BOUNDS, score, side='right'))]
     
     def score_clause_with_llm(self, clause_text: str, contract_type: str) -> Dict:
         """
@@ -134,18 +293,20 @@ Respond in JSON format:
   "rationale": "Brief explanation"
 }}"""
 
-            response = self.client.chat.completions.create(
+            # Stop reading the stream as soon as the JSON object is complete
+            content = ''.join(chat_completion_stream(
+                self.client,
                 model="llama-3.3-70b-versatile",
                 messages=[
                     {"role": "system", "content": "You are a legal risk analyst for Indian SMEs. Provide concise, actionable risk assessments."},
                     {"role": "user", "content": prompt}
                 ],
+                until=self._has_json_object,
                 temperature=0.3,
                 max_tokens=500
-            )
+            ))
             
-            import json
-            result = json.loads(response.choices[0].message.content)
+            result = self._parse_json_object(content)
             
             return {
                 'score': result.get('risk_score', 50),
@@ -158,52 +319,20 @@ Respond in JSON format:
             print(f"LLM scoring failed: {e}")
             return self.score_clause(clause_text, contract_type)
     
-    def _get_risk_patterns(self) -> Dict:
-        """Define risk patterns with weights"""
-        return {
-            'unilateral_termination': {
-                'keywords': ['may terminate', 'right to terminate', 'terminate at will', 'terminate without cause', 'sole discretion'],
-                'weight': 30,
-                'description': 'One-sided termination rights (may be void per Indian Contract Act if arbitrary)'
-            },
-            'uncapped_liability': {
-                'keywords': ['unlimited liability', 'no limit', 'without limitation', 'liable for all', 'indemnify against all'],
-                'weight': 35,
-                'description': 'Unlimited liability exposure'
-            },
-            'auto_renewal_lock_in': {
-                'keywords': ['automatically renew', 'auto-renewal', 'lock-in period', 'cannot terminate during'],
-                'weight': 20,
-                'description': 'Auto-renewal or Lock-in period (check if > 3 years)'
-            },
-            'penalty_high': {
-                'keywords': ['penalty', 'liquidated damages', 'forfeit', 'pay as damages'],
-                'weight': 25,
-                'description': 'Penalty clause (Indian courts distinguish between reasonable compensation and penalty)'
-            },
-            'non_compete_excessive': {
-                'keywords': ['non-compete', 'shall not compete', 'restrictive covenant', 'after termination'],
-                'weight': 30,
-                'description': 'Post-termination non-compete (Often void in India under Sec 27 unless reasonable)'
-            },
-            'ip_transfer': {
-                'keywords': ['transfer of intellectual property', 'ip rights transfer', 'ownership of all work', 'work for hire'],
-                'weight': 25,
-                'description': 'Intellectual property transfer'
-            },
-            'foreign_jurisdiction': {
-                'keywords': ['courts of singapore', 'courts of london', 'exclusive jurisdiction of', 'outside india'],
-                'weight': 40,
-                'description': 'Foreign Jurisdiction (High cost/risk for Indian SME)'
-            },
-            'arbitration_cost': {
-                'keywords': ['arbitration in london', 'singapore international arbitration', 'icc rules'],
-                'weight': 35,
-                'description': 'High-cost International Arbitration'
-            },
-            'ambiguous_terms': {
-                'keywords': ['reasonable', 'best efforts', 'as soon as possible', 'appropriate'],
-                'weight': 10,
-                'description': 'Ambiguous or vague terms'
-            }
-        }
+    def _has_json_object(self, text: str) -> bool:
+        """True once text contains a complete JSON object"""
+        if '}' not in text:
+            return False
+        try:
+            self._parse_json_object(text)
+            return True
+        except ValueError:
+            return False
+    
+    def _parse_json_object(self, text: str) -> Dict:
+        """Decode the first JSON object in text, ignoring anything around it"""
+        start = text.find('{')
+        if start == -1:
+            raise ValueError('No JSON object in response')
+        result, _ = json.JSONDecoder().raw_decode(text[start:])
+        return result
@@ -0,0 +1,84 @@
+"""
+Model Registry - Load the spaCy pipeline and NLP components once per process
+"""
+from functools import lru_cache
+from typing import Optional
+import os
+
+import spacy
+from spacy.language import Language
+
+SPACY_MODEL = "en_core_web_lg"
+
+# Nothing reads POS tags, dependencies, sentences or lemmas: entity extraction uses
+# tok2vec + ner and similarity only the word vectors, so these are never loaded
+EXCLUDED_COMPONENTS = ('tagger', 'parser', 'senter', 'attribute_ruler', 'lemmatizer')
+
+# Opt-in: run the pipeline on the GPU (needs spacy[cuda] / cupy); CPU stays the default
+USE_GPU = os.getenv('ANALYZE_USE_GPU', '').lower() in ('1', 'true', 'yes')
+
+# Texts per nlp.pipe batch (override with SPACY_BATCH_SIZE); larger batches keep the GPU busy
+PIPE_BATCH_SIZE = int(os.getenv('SPACY_BATCH_SIZE', '128' if USE_GPU else '64'))
+
+# Keep standard-clause matrices as int8 (SIMILARITY_INT8_STANDARDS=1) for large template libraries
+INT8_STANDARDS = os.getenv('SIMILARITY_INT8_STANDARDS', '').lower() in ('1', 'true', 'yes')
+
+# Directory with model.onnx + tokenizer.json of a sentence encoder (e.g. all-MiniLM-L6-v2);
+# when set, clause similarity uses it instead of the spaCy word vectors
+SIMILARITY_ONNX_MODEL = os.getenv('SIMILARITY_ONNX_MODEL')
+
+@lru_cache(maxsize=1)
+def get_nlp() -> Optional[Language]:
+    """Shared spaCy pipeline, or None when the model is not installed"""
+    if USE_GPU:
+        # Must run before spacy.load so the model's weights are allocated on the device
+        try:
+            spacy.require_gpu()
+        except (ValueError, ImportError) as e:
+            print(f"Warning: ANALYZE_USE_GPU is set but no GPU is usable ({e}); using CPU")
+    
+    try:
+        return spacy.load(SPACY_MODEL, exclude=EXCLUDED_COMPONENTS)
+    except OSError:
+        print(f"Warning: {SPACY_MODEL} not found. Install with: python -m spacy download {SPACY_MODEL}")
+        return None
+
+@lru_cache(maxsize=1)
+def get_entity_extractor():
+    from .extractors.entity_extractor import EntityExtractor
+    return EntityExtractor(get_nlp())
+
+@lru_cache(maxsize=1)
+def get_sentence_encoder():
+    """Shared sentence encoder, or None when none is configured or it cannot be loaded"""
+    if not SIMILARITY_ONNX_MODEL:
+        return None
+    
+    from .sentence_encoder import SentenceEncoder
+    try:
+        return SentenceEncoder(SIMILARITY_ONNX_MODEL)
+    except Exception as e:
+        print(f"Warning: sentence encoder at {SIMILARITY_ONNX_MODEL} could not be loaded ({e}); using spaCy vectors")
+        return None
+
+@lru_cache(maxsize=1)
+def get_similarity():
+    from .similarity import ClauseSimilarity
+    return ClauseSimilarity(int8_standards=INT8_STANDARDS)
+
+@lru_cache(maxsize=1)
+def get_classifier():
+    from .classifiers.contract_classifier import ContractClassifier
+    return ContractClassifier()
+
+@lru_cache(maxsize=1)
+def get_clause_extractor():
+    from .extractors.clause_extractor import ClauseExtractor
+    return ClauseExtractor()
+
+def preload():
+    """Build every shared component up front so the first request does not pay for it"""
+    get_entity_extractor()
+    get_similarity()
+    get_classifier()
+    get_clause_extractor()
@@ -0,0 +1,107 @@
+"""
+Byte Automaton - Aho-Corasick DFA over UTF-8 bytes for scanning many texts at once
+
+The scan kernel is compiled with Numba when it is installed; otherwise the same
+kernel runs as plain Python, which is only suitable for small inputs.
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+    prange = numba.prange
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+# Each group is one bit of an int64 mask (the sign bit is left unused)
+MAX_GROUPS = 63
+
+def _scan_batch(buf: np.ndarray, offsets: np.ndarray, goto: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Run the DFA over every text in buf (texts i spans offsets[i]:offsets[i+1])"""
+    n = offsets.shape[0] - 1
+    masks = np.zeros(n, dtype=np.int64)
+    for i in prange(n):
+        state = 0
+        mask = 0
+        for j in range(offsets[i], offsets[i + 1]):
+            state = goto[state, buf[j]]
+            mask |= out[state]
+        masks[i] = mask
+    return masks
+
+if NUMBA_AVAILABLE:
+    _scan_batch = numba.njit(parallel=True, cache=True)(_scan_batch)
+
+class ByteAutomaton:
+    """Dense-table Aho-Corasick automaton reporting which keyword groups occur in each text"""
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.groups = list(groups)
+        if len(self.groups) > MAX_GROUPS:
+            raise ValueError(f"ByteAutomaton supports at most {MAX_GROUPS} groups")
+
+        self._goto, self._out = self._build_tables(groups)
+
+    def scan(self, texts: List[str]) -> np.ndarray:
+        """
+        Scan the texts in one batch
+
+        Returns:
+            int64 array with one group bitmask per text (bit i = self.groups[i])
+        """
+        if not texts:
+            return np.zeros(0, dtype=np.int64)
+
+        # Lone surrogates (valid in JSON input) are kept, as KeywordMatcher does
+        encoded = [text.encode('utf-8', 'surrogatepass') for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded)))
+        buf = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+        return _scan_batch(buf, offsets, self._goto, self._out)
+
+    def groups_in(self, mask: int) -> List[str]:
+        """Expand a mask returned by scan into group names"""
+        return [group for bit, group in enumerate(self.groups) if mask & (1 << bit)]
+
+    def _build_tables(self, groups: Dict[str, Iterable[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Build the trie, resolve failure links, and flatten them into a full DFA"""
+        children: List[Dict[int, int]] = [{}]
+        out = [0]
+
+        for bit, group in enumerate(self.groups):
+            for keyword in groups[group]:
+                state = 0
+                for byte in keyword.encode('utf-8'):
+                    if byte not in children[state]:
+                        children.append({})
+                        out.append(0)
+                        children[state][byte] = len(children) - 1
+                    state = children[state][byte]
+                out[state] |= 1 << bit
+
+        goto = np.zeros((len(children), 256), dtype=np.int32)
+        fail = [0] * len(children)
+
+        # Breadth-first so every failure target is complete before it is used
+        for byte, child in children[0].items():
+            goto[0, byte] = child
+        queue = deque(children[0].values())
+        while queue:
+            state = queue.popleft()
+            out[state] |= out[fail[state]]
+            goto[state] = goto[fail[state]]
+            for byte, child in children[state].items():
+                fail[child] = goto[fail[state], byte]
+                goto[state, byte] = child
+                queue.append(child)
+
+        return goto, np.array(out, dtype=np.int64)
+
+if NUMBA_AVAILABLE:
+    # Compile (or load from the on-disk cache) at import instead of on the first request
+    _scan_batch(np.zeros(1, dtype=np.uint8), np.array([0, 1], dtype=np.int64),
+                np.zeros((1, 256), dtype=np.int32), np.zeros(1, dtype=np.int64))
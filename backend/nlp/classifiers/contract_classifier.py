@@ -1,7 +1,19 @@
 """
 Contract Classifier - Identify contract type
 """
-from typing import Dict
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import hashlib
+import threading
+
+import numpy as np
+
+from ..keyword_matcher import KeywordMatcher
+
+# Keyword scores per document, shared by classify and get_confidence
+SCORE_CACHE_SIZE = 256
+_score_cache: 'OrderedDict[bytes, np.ndarray]' = OrderedDict()
+_score_cache_lock = threading.Lock()
 
 class ContractClassifier:
     """Classify contract into predefined types"""
@@ -35,53 +47,72 @@ class ContractClassifier:
                 'deliverables', 'service provider', 'client', 'project'
             ]
         }
+        
+        self._matcher = KeywordMatcher(self.type_keywords)
+        self._type_names = list(self.type_keywords)
+        self._type_idx = {name: i for i, name in enumerate(self._type_names)}
     
-    def classify(self, text: str) -> str:
+    def classify(self, text: str, text_lower: Optional[str] = None) -> str:
         """
         Classify contract based on keyword matching
         
+        Args:
+            text: Contract text
+            text_lower: Precomputed text.lower(), if the caller already has it
+        
         Returns:
             Contract type: employment, vendor, lease, partnership, service, or general
         """
-        text_lower = text.lower()
-        
-        scores = {}
-        
-        # Score each contract type
-        for contract_type, keywords in self.type_keywords.items():
-            score = 0
-            for keyword in keywords:
-                # Count occurrences
-                count = text_lower.count(keyword)
-                score += count
-            scores[contract_type] = score
-        
-        # Get highest scoring type
-        if max(scores.values()) > 0:
-            return max(scores, key=scores.get)
-        
-        return 'general'
+        return self.classify_with_confidence(text, text_lower)[0]
     
-    def get_confidence(self, text: str) -> Dict[str, float]:
+    def get_confidence(self, text: str, text_lower: Optional[str] = None) -> Dict[str, float]:
         """
         Get classification confidence scores for all types
         
         Returns:
             Dict with contract types and normalized confidence scores
         """
-        text_lower = text.lower()
-        scores = {}
+        return self.classify_with_confidence(text, text_lower)[1]
+    
+    def classify_with_confidence(self, text: str, text_lower: Optional[str] = None) -> Tuple[str, Dict[str, float]]:
+        """
+        Contract type and confidence scores from one keyword pass
         
-        for contract_type, keywords in self.type_keywords.items():
-            score = 0
-            for keyword in keywords:
-                count = text_lower.count(keyword)
-                score += count
-            scores[contract_type] = score
+        Returns:
+            (contract type, dict with contract types and normalized confidence scores)
+        """
+        scores = self._cached_score_vector(text, text_lower)
+        
+        # Highest scoring type (first in declaration order on ties)
+        contract_type = self._type_names[int(scores.argmax())] if scores.any() else 'general'
         
         # Normalize scores
-        total = sum(scores.values())
-        if total > 0:
-            scores = {k: v/total for k, v in scores.items()}
+        confidence = scores / max(int(scores.sum()), 1)
+        
+        return contract_type, dict(zip(self._type_names, confidence.tolist()))
+    
+    def _cached_score_vector(self, text: str, text_lower: Optional[str] = None) -> np.ndarray:
+        """Keyword scores for text, reused when the same document is classified again"""
+        key = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
         
+        with _score_cache_lock:
+            if key in _score_cache:
+                _score_cache.move_to_end(key)
+                return _score_cache[key]
+        
+        scores = self._score_vector(text_lower if text_lower is not None else text.lower())
+        scores.flags.writeable = False
+        
+        with _score_cache_lock:
+            _score_cache[key] = scores
+            while len(_score_cache) > SCORE_CACHE_SIZE:
+                _score_cache.popitem(last=False)
+        
+        return scores
+    
+    def _score_vector(self, text_lower: str) -> np.ndarray:
+        """Count keyword occurrences per contract type (in _type_names order) in a single pass"""
+        scores = np.zeros(len(self._type_names), dtype=np.int32)
+        for contract_type in self._matcher.iter(text_lower):
+            scores[self._type_idx[contract_type]] += 1
         return scores
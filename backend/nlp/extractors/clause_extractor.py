@@ -2,14 +2,107 @@
 Clause Extractor - Segment contract into clauses
 """
 import re
-from typing import List, Dict
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..byte_automaton import ByteAutomaton, NUMBA_AVAILABLE
+from ..keyword_matcher import KeywordMatcher
+from .entity_extractor import entity_records
+
+@lru_cache(maxsize=4096)
+def _norm(text: str) -> str:
+    """NFKC-normalized, lowercased text; the same clause is often classified more than once"""
+    return unicodedata.normalize('NFKC', text).lower().strip()
+
+@dataclass(slots=True)
+class Clause:
+    """
+    One extracted clause
+    
+    Supports dict-style access (clause['text'], clause.get('risk_level')) so
+    code that handles plain clause dicts from API payloads works on both.
+    """
+    id: str
+    header: str
+    text: str
+    # True when header is a section heading rather than the start of the paragraph
+    sectioned: bool = False
+    type: str = 'general'
+    word_count: int = 0
+    risk_score: float = 0
+    risk_level: str = ''
+    # Column layout from EntityExtractor.extract_columns, or the per-entity dicts of extract
+    entities: Dict = field(default_factory=dict)
+    similarity_score: Optional[float] = None
+    is_standard: Optional[bool] = None
+    deviation_flag: Optional[bool] = None
+    suggested_standard: Optional[str] = None
+    # Normalized, lowercased text for keyword scans (see _norm); not part of the API output
+    text_lower: str = field(default='', repr=False)
+    
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __setitem__(self, key: str, value: Any):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+    
+    @property
+    def full_text(self) -> str:
+        """Header and text as they appear in the contract, composed on demand"""
+        if self.sectioned:
+            return f"{self.header}\n{self.text}"
+        return self.text
+    
+    def to_dict(self, include_full_text: bool = False) -> Dict:
+        """JSON-ready dict in the shape returned by /api/analyze"""
+        result = {
+            'id': self.id,
+            'header': self.header,
+            'text': self.text,
+            'type': self.type,
+            'word_count': self.word_count,
+            'entities': self._entity_records(),
+            'risk_score': self.risk_score,
+            'risk_level': self.risk_level
+        }
+        if self.similarity_score is not None:
+            result['similarity_score'] = self.similarity_score
+            result['is_standard'] = self.is_standard
+            result['deviation_flag'] = self.deviation_flag
+        if self.suggested_standard is not None:
+            result['suggested_standard'] = self.suggested_standard
+        if include_full_text:
+            result['full_text'] = self.full_text
+        return result
+
+    def _entity_records(self) -> Dict:
+        """Entities as lists of dicts; columns are converted here, at the JSON boundary"""
+        if any(isinstance(bucket, dict) for bucket in self.entities.values()):
+            return entity_records(self.entities)
+        return self.entities
 
 class ClauseExtractor:
     """Extract and classify clauses from contract text"""
     
+    # Contracts with at least this many clauses are classified in one compiled byte-level scan
+    BATCH_SCAN_MIN_CLAUSES = 64
+    
     def __init__(self):
         # Clause headers pattern (numbered sections) - Supports "1. Title", "1.1 Title", "ARTICLE 1"
         self.clause_header_pattern = r'(?i)\n(\d+(\.\d+)*\.?\s+[a-z][a-z0-9\s\(\)\-\,]+|article\s+\d+)\n'
+        self._header_re = re.compile(self.clause_header_pattern)
+        self._para_re = re.compile(r'\n\s*\n')
         
         # Obligation/Right/Prohibition keywords (English + Hindi)
         self.obligation_keywords = [
@@ -32,8 +125,29 @@ class ClauseExtractor:
             'means', 'refers to', 'defined as', 'definition',
             'का अर्थ', 'तत्पर्य', 'परिभाषा'
         ]
+        
+        # Categories in priority order (prohibitions are the most specific)
+        category_keywords = {
+            'prohibition': self.prohibition_keywords,
+            'obligation': self.obligation_keywords,
+            'right': self.right_keywords,
+            'condition': self.condition_keywords,
+            'definition': self.definition_keywords
+        }
+        self._category_matcher = KeywordMatcher(category_keywords)
+        # Hindi keywords cannot occur in ASCII text, which is most clauses; those
+        # are scanned with a smaller English-only automaton
+        self._ascii_category_matcher = KeywordMatcher({
+            category: [keyword for keyword in keywords if keyword.isascii()]
+            for category, keywords in category_keywords.items()
+        })
+        # UTF-8 DFA over all keywords, Hindi and English alike; groups keep priority order,
+        # so the lowest set bit of a clause's mask is its category
+        self._byte_automaton = ByteAutomaton(category_keywords) if NUMBA_AVAILABLE else None
+        self._category_priority = ['prohibition', 'obligation', 'right', 'condition', 'definition']
+        self._category_rank = {category: rank for rank, category in enumerate(self._category_priority)}
     
-    def extract(self, text: str) -> List[Dict]:
+    def extract(self, text: str) -> List[Clause]:
         """
         Extract clauses from contract text
         """
@@ -43,7 +157,7 @@ class ClauseExtractor:
         text = text.replace('\r\n', '\n')
         
         # Method 1: Split by numbered sections
-        sections = re.split(self.clause_header_pattern, text)
+        sections = self._header_re.split(text)
         
         if len(sections) > 2:  # Found numbered sections
             clauses = self._process_numbered_sections(sections)
@@ -52,15 +166,39 @@ class ClauseExtractor:
         if len(clauses) < 2:
             clauses = self._process_paragraphs(text)
         
-        # Classify each clause
+        # Classify each clause; the lowercased text is kept for risk scoring
         for i, clause in enumerate(clauses):
-            clause['id'] = f"clause_{i+1}"
-            clause['type'] = self._classify_clause(clause['text'])
-            clause['word_count'] = len(clause['text'].split())
+            clause.id = f"clause_{i+1}"
+            clause.text_lower = _norm(clause.text)
+            clause.word_count = len(clause.text.split())
+        
+        for clause, clause_type in zip(clauses, self._classify_normalized([clause.text_lower for clause in clauses])):
+            clause.type = clause_type
         
         return clauses
     
-    def _process_numbered_sections(self, sections: List[str]) -> List[Dict]:
+    def classify_batch(self, texts: List[str]) -> List[str]:
+        """
+        Classify many clause texts at once
+        
+        Returns:
+            One clause type per text, in order (see _classify_clause)
+        """
+        return self._classify_normalized([_norm(text) for text in texts])
+    
+    def _classify_normalized(self, texts_lower: List[str]) -> List[str]:
+        """Types of already-normalized texts; all in one keyword scan when the matcher supports it"""
+        if self._byte_automaton is not None and len(texts_lower) >= self.BATCH_SCAN_MIN_CLAUSES:
+            groups = self._byte_automaton.groups
+            return [
+                groups[(mask & -mask).bit_length() - 1] if mask else 'general'
+                for mask in self._byte_automaton.scan(texts_lower).tolist()
+            ]
+        if self._category_matcher.scans_in_batches:
+            return [self._best_category(categories) for categories in self._category_matcher.find_many(texts_lower)]
+        return [self._classify_clause(text_lower, text_lower) for text_lower in texts_lower]
+    
+    def _process_numbered_sections(self, sections: List[str]) -> List[Clause]:
         """Process text split by numbered sections"""
         clauses = []
         # re.split with capturing group returns [pre, delimiter, match_group..., content, delimiter...]
@@ -76,58 +214,56 @@ class ClauseExtractor:
             if len(part) < 100 and (part[0].isdigit() or part.lower().startswith('article')):
                 current_header = part
             elif len(part) > 20: # Content
-                clauses.append({
-                    'header': current_header,
-                    'text': part,
-                    'full_text': f"{current_header}\n{part}"
-                })
+                clauses.append(Clause(
+                    id='',
+                    header=current_header,
+                    text=part,
+                    sectioned=True
+                ))
         
         return clauses
     
-    def _process_paragraphs(self, text: str) -> List[Dict]:
+    def _process_paragraphs(self, text: str) -> List[Clause]:
         """Process text by splitting into paragraphs"""
         # Improved splitting: split by double newline OR newline followed by space/tab (indentation)
-        paragraphs = re.split(r'\n\s*\n', text)
+        paragraphs = self._para_re.split(text)
         clauses = []
         
         for para in paragraphs:
             para = para.strip()
             if len(para) > 20:  # Reduced threshold from 50 to 20
-                clauses.append({
-                    'header': para[:50] + '...' if len(para) > 50 else para,
-                    'text': para,
-                    'full_text': para
-                })
+                clauses.append(Clause(
+                    id='',
+                    header=para[:50] + '...' if len(para) > 50 else para,
+                    text=para
+                ))
         
         return clauses
     
-    def _classify_clause(self, text: str) -> str:
+    def _classify_clause(self, text: str, text_lower: Optional[str] = None) -> str:
         """
         Classify clause as obligation, right, prohibition, or condition
         """
-        text_lower = text.lower()
+        if text_lower is None:
+            text_lower = _norm(text)
+        matcher = self._ascii_category_matcher if text_lower.isascii() else self._category_matcher
         
-        # Check for prohibitions first (more specific)
-        for keyword in self.prohibition_keywords:
-            if keyword in text_lower:
-                return 'prohibition'
-        
-        # Check for obligations
-        for keyword in self.obligation_keywords:
-            if keyword in text_lower:
-                return 'obligation'
-        
-        # Check for rights
-        for keyword in self.right_keywords:
-            if keyword in text_lower:
-                return 'right'
-        
-        # Check for conditions
-        if any(kw in text_lower for kw in self.condition_keywords):
-            return 'condition'
-        
-        # Check for definitions
-        if any(kw in text_lower for kw in self.definition_keywords):
-            return 'definition'
+        # Single pass over the text; a prohibition outranks everything, so stop there
+        best = len(self._category_priority)
+        for category in matcher.iter(text_lower):
+            rank = self._category_rank[category]
+            if rank < best:
+                best = rank
+                if rank == 0:
+                    break
         
+        if best < len(self._category_priority):
+            return self._category_priority[best]
         return 'general'
+    
+    def _best_category(self, categories: Iterable[str]) -> str:
+        """Highest-priority category among those found, or 'general'"""
+        best = min((self._category_rank[category] for category in categories), default=None)
+        if best is None:
+            return 'general'
+        return self._category_priority[best]
@@ -1,20 +1,130 @@
 """
 Entity Extractor - Extract named entities from contract text
+
+Only doc.ents is used, so texts are run through tok2vec + ner; the shared
+model is loaded without the tagger, parser, attribute_ruler and lemmatizer.
 """
-import spacy
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import re
+import threading
+import numpy as np
+
+from spacy.language import Language
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+from .._registry import PIPE_BATCH_SIZE, get_nlp
+
+# spaCy components entity extraction needs; every other component is disabled per call
+NER_COMPONENTS = ('tok2vec', 'ner')
+
+# Fields of each entity bucket, in record key order
+BUCKET_FIELDS = {
+    'parties': ('text', 'type', 'start', 'end'),
+    'dates': ('text', 'start', 'end'),
+    'amounts': ('text', 'start', 'end'),
+    'jurisdiction': ('text', 'context', 'start', 'end'),
+    'durations': ('text', 'value', 'unit', 'start', 'end'),
+    'locations': ('text', 'type', 'start', 'end')
+}
+
+# Character offsets, stored as int32 arrays in the column layout. Duration values
+# stay Python ints: they are parsed from arbitrary digit runs and could overflow
+INT_FIELDS = frozenset(('start', 'end'))
+
+# Compiled once at import; kept as separate patterns because each one starts with a
+# literal that re can search for quickly, which a fused alternation would lose
+_JURISDICTION_RES = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'governed by.*?laws of ([^,\.]+)',
+    r'jurisdiction of ([^,\.]+)',
+    r'courts? (?:of|in) ([^,\.]+)',
+    r'arbitration in ([^,\.]+)'
+)]
+
+_DURATION_RE = re.compile(r'\b(\d+)\s+(day|week|month|year)s?\b', re.IGNORECASE)
+
+_ENTITY_RES = (*_JURISDICTION_RES, _DURATION_RE)
+
+# Hyperscan expressions matching wherever the corresponding _ENTITY_RES pattern
+# can start (its leading part, with Python's ASCII \s spelled out). They locate
+# candidate starts in one pass; re then matches only there.
+_ENTITY_ANCHORS = (
+    rb'governed by',
+    rb'jurisdiction of',
+    rb'courts? (?:of|in) ',
+    rb'arbitration in ',
+    rb'\b\d+[\t\n\x0b\x0c\r\x1c-\x1f ]+(?:day|week|month|year)'
+)
+
+def _build_anchor_db():
+    db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+    db.compile(
+        expressions=list(_ENTITY_ANCHORS),
+        ids=list(range(len(_ENTITY_ANCHORS))),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST] * len(_ENTITY_ANCHORS)
+    )
+    return db
+
+_ANCHOR_DB = _build_anchor_db() if hyperscan is not None else None
+
+# Scratch space cannot be shared by concurrent scans; one per thread
+_hs_local = threading.local()
+
+def _find_entity_matches(text: str) -> List[Iterable[re.Match]]:
+    """
+    Matches of every _ENTITY_RES pattern, identical to pattern.finditer(text)
+    
+    ASCII texts are scanned once with Hyperscan for candidate starts; other
+    texts (where re's Unicode classes differ from Hyperscan's) use finditer.
+    """
+    if _ANCHOR_DB is None or not text.isascii():
+        return [pattern.finditer(text) for pattern in _ENTITY_RES]
+    
+    scratch = getattr(_hs_local, 'scratch', None)
+    if scratch is None:
+        scratch = _hs_local.scratch = hyperscan.Scratch(_ANCHOR_DB)
+    
+    starts = [set() for _ in _ENTITY_RES]
+    _ANCHOR_DB.scan(
+        text.encode('ascii'),
+        match_event_handler=lambda pattern_id, start, end, flags, context: starts[pattern_id].add(start),
+        scratch=scratch
+    )
+    return [_matches_at(pattern, text, pattern_starts) for pattern, pattern_starts in zip(_ENTITY_RES, starts)]
+
+def _matches_at(pattern: re.Pattern, text: str, starts: Iterable[int]) -> Iterator[re.Match]:
+    """Non-overlapping matches of pattern, trying it only at the candidate starts"""
+    end = 0
+    for start in sorted(starts):
+        if start < end:
+            continue
+        match = pattern.match(text, start)
+        if match:
+            yield match
+            end = match.end()
+
+def entity_records(columns: Dict[str, Dict]) -> Dict[str, List[Dict]]:
+    """Convert column-oriented entities (see extract_columns) to one dict per entity"""
+    records = {}
+    for bucket, bucket_columns in columns.items():
+        values = [c.tolist() if isinstance(c, np.ndarray) else c for c in bucket_columns.values()]
+        records[bucket] = [dict(zip(bucket_columns, row)) for row in zip(*values)]
+    return records
 
 class EntityExtractor:
     """Extract legal entities (parties, dates, amounts, jurisdiction, etc.)"""
     
-    def __init__(self):
-        # Load spaCy model
-        try:
-            self.nlp = spacy.load("en_core_web_lg")
-        except OSError:
-            print("Warning: en_core_web_lg not found. Install with: python -m spacy download en_core_web_lg")
-            self.nlp = None
+    def __init__(self, nlp: Optional[Language] = None):
+        # Shared spaCy model (loaded once per process) unless one is passed in
+        self.nlp = nlp if nlp is not None else get_nlp()
+        
+        # The model is shared with ClauseSimilarity, so components are disabled per call
+        self._unused_components = [
+            name for name in (self.nlp.pipe_names if self.nlp else []) if name not in NER_COMPONENTS
+        ]
     
     def extract(self, text: str) -> Dict[str, List]:
         """
@@ -23,107 +133,80 @@ class EntityExtractor:
         Returns:
             Dict with entity types: parties, dates, amounts, jurisdiction, etc.
         """
-        entities = {
-            'parties': [],
-            'dates': [],
-            'amounts': [],
-            'jurisdiction': [],
-            'durations': [],
-            'locations': []
-        }
+        return self.extract_many([text])[0]
+    
+    def extract_many(self, texts: List[str], batch_size: int = PIPE_BATCH_SIZE) -> List[Dict[str, List]]:
+        """
+        Extract entities from many texts, running spaCy over them in batches
+        
+        Returns:
+            One entity dict per text, in the same order (see extract)
+        """
+        return [entity_records(columns) for columns in self.extract_columns(texts, batch_size)]
+    
+    def extract_columns(self, texts: List[str], batch_size: int = PIPE_BATCH_SIZE) -> List[Dict[str, Dict]]:
+        """
+        Like extract_many, but each bucket holds one column per field instead of one dict per entity
         
+        Returns:
+            Per text, {bucket: {field: values}}; start and end are int32 arrays,
+            other fields lists. entity_records converts back to the extract format.
+        """
         if not self.nlp:
-            return entities
+            return [self._collect_entities(None, '') for _ in texts]
+        
+        docs = self.nlp.pipe(texts, batch_size=batch_size, disable=self._unused_components)
+        return [self._collect_entities(doc, text) for doc, text in zip(docs, texts)]
+    
+    def _collect_entities(self, doc, text: str) -> Dict[str, Dict]:
+        """Bucket spaCy entities and regex matches for one text into columns, skipping repeated texts"""
+        columns = {bucket: {name: [] for name in fields} for bucket, fields in BUCKET_FIELDS.items()}
+        seen = {bucket: set() for bucket in columns}
         
-        doc = self.nlp(text)
+        def add(bucket: str, values: Tuple):
+            # values are in BUCKET_FIELDS order, text first
+            key = values[0].lower().strip()
+            if key and key not in seen[bucket]:
+                seen[bucket].add(key)
+                for column, value in zip(columns[bucket].values(), values):
+                    column.append(value)
         
         # Extract using spaCy NER
-        for ent in doc.ents:
+        for ent in (doc.ents if doc is not None else ()):
             if ent.label_ in ['PERSON', 'ORG']:
-                entities['parties'].append({
-                    'text': ent.text,
-                    'type': ent.label_,
-                    'start': ent.start_char,
-                    'end': ent.end_char
-                })
+                add('parties', (ent.text, ent.label_, ent.start_char, ent.end_char))
             elif ent.label_ == 'DATE':
-                entities['dates'].append({
-                    'text': ent.text,
-                    'start': ent.start_char,
-                    'end': ent.end_char
-                })
+                add('dates', (ent.text, ent.start_char, ent.end_char))
             elif ent.label_ == 'MONEY':
-                entities['amounts'].append({
-                    'text': ent.text,
-                    'start': ent.start_char,
-                    'end': ent.end_char
-                })
+                add('amounts', (ent.text, ent.start_char, ent.end_char))
             elif ent.label_ in ['GPE', 'LOC']:
-                entities['locations'].append({
-                    'text': ent.text,
-                    'type': ent.label_,
-                    'start': ent.start_char,
-                    'end': ent.end_char
-                })
+                add('locations', (ent.text, ent.label_, ent.start_char, ent.end_char))
         
-        # Extract jurisdiction-specific patterns
-        entities['jurisdiction'] = self._extract_jurisdiction(text)
+        if text:
+            # One scan for the jurisdiction and duration patterns
+            matches = _find_entity_matches(text)
+            
+            # Extract jurisdiction-specific patterns
+            for values in self._extract_jurisdiction(matches[:len(_JURISDICTION_RES)]):
+                add('jurisdiction', values)
+            
+            # Extract durations (e.g., "2 years", "6 months")
+            for values in self._extract_durations(matches[-1]):
+                add('durations', values)
         
-        # Extract durations (e.g., "2 years", "6 months")
-        entities['durations'] = self._extract_durations(text)
+        for bucket_columns in columns.values():
+            for name in INT_FIELDS.intersection(bucket_columns):
+                bucket_columns[name] = np.array(bucket_columns[name], dtype=np.int32)
         
-        # Deduplicate
-        for key in entities:
-            entities[key] = self._deduplicate_entities(entities[key])
-        
-        return entities
+        return columns
     
-    def _extract_jurisdiction(self, text: str) -> List[Dict]:
-        """Extract jurisdiction and governing law mentions"""
-        jurisdiction_patterns = [
-            r'governed by.*?laws of ([^,\.]+)',
-            r'jurisdiction of ([^,\.]+)',
-            r'courts? (?:of|in) ([^,\.]+)',
-            r'arbitration in ([^,\.]+)'
-        ]
-        
-        jurisdictions = []
-        for pattern in jurisdiction_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                jurisdictions.append({
-                    'text': match.group(1).strip(),
-                    'context': match.group(0),
-                    'start': match.start(),
-                    'end': match.end()
-                })
-        
-        return jurisdictions
+    def _extract_jurisdiction(self, matches: List[Iterable[re.Match]]) -> Iterator[Tuple]:
+        """Extract jurisdiction and governing law mentions as (text, context, start, end)"""
+        for pattern_matches in matches:
+            for match in pattern_matches:
+                yield (match.group(1).strip(), match.group(0), match.start(), match.end())
     
-    def _extract_durations(self, text: str) -> List[Dict]:
-        """Extract time durations (lock-in periods, notice periods, etc.)"""
-        duration_pattern = r'\b(\d+)\s+(day|week|month|year)s?\b'
-        
-        durations = []
-        matches = re.finditer(duration_pattern, text, re.IGNORECASE)
+    def _extract_durations(self, matches: Iterable[re.Match]) -> Iterator[Tuple]:
+        """Extract time durations (lock-in periods, notice periods, etc.) as (text, value, unit, start, end)"""
         for match in matches:
-            durations.append({
-                'text': match.group(0),
-                'value': int(match.group(1)),
-                'unit': match.group(2).lower(),
-                'start': match.start(),
-                'end': match.end()
-            })
-        
-        return durations
-    
-    def _deduplicate_entities(self, entities: List[Dict]) -> List[Dict]:
-        """Remove duplicate entities based on text"""
-        seen = set()
-        unique = []
-        for entity in entities:
-            text = entity.get('text', '').lower().strip()
-            if text and text not in seen:
-                seen.add(text)
-                unique.append(entity)
-        return unique
+            yield (match.group(0), int(match.group(1)), match.group(2).lower(), match.start(), match.end())
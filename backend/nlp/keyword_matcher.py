@@ -0,0 +1,208 @@
+"""
+Keyword Matcher - Scan text for many keywords in a single pass
+"""
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+import re
+import threading
+import numpy as np
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+# Texts at least this long (in characters) are scanned with Hyperscan when it is installed
+HYPERSCAN_MIN_LENGTH = 16 * 1024
+
+# Separates texts joined for one batched scan; no keyword contains it
+_SENTINEL = b'\x00'
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over grouped keywords (e.g. risk pattern -> keywords)
+    
+    Falls back to a single compiled regex alternation when pyahocorasick is not installed.
+    Long texts are scanned with a Hyperscan literal database when hyperscan is available.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        # A keyword may belong to several groups; every group is reported on a hit
+        self._groups_of: Dict[str, Tuple[str, ...]] = {}
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                self._groups_of[keyword] = self._groups_of.get(keyword, ()) + (group,)
+
+        self._group_count = len({group for owners in self._groups_of.values() for group in owners})
+        self._automaton = None
+        self._pattern = None
+        self._hs_db = None
+
+        if not self._groups_of:
+            return
+
+        if hyperscan is not None:
+            self._build_hyperscan()
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword, owners in self._groups_of.items():
+                self._automaton.add_word(keyword, owners)
+            self._automaton.make_automaton()
+        else:
+            self._build_regex()
+
+    def _build_regex(self):
+        """Compile all keywords into one lookahead alternation, longest keyword first"""
+        keywords = sorted(self._groups_of, key=len, reverse=True)
+        self._pattern = re.compile('(?=(' + '|'.join(map(re.escape, keywords)) + '))')
+
+        # The alternation reports only the longest keyword at each position; every
+        # shorter keyword that is a prefix of it also occurs there
+        self._owners_at: Dict[str, Tuple[str, ...]] = {}
+        for keyword in keywords:
+            owners = ()
+            for other in keywords:
+                if keyword.startswith(other):
+                    owners += self._groups_of[other]
+            self._owners_at[keyword] = owners
+
+    def _build_hyperscan(self):
+        """Compile every keyword as a UTF-8 byte literal; ids index into _hs_owners"""
+        keywords = list(self._groups_of)
+        self._hs_owners = [self._groups_of[keyword] for keyword in keywords]
+        self._hs_db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        self._hs_db.compile(
+            expressions=[keyword.encode('utf-8') for keyword in keywords],
+            ids=list(range(len(keywords))),
+            flags=0,
+            literal=True
+        )
+        # Scratch space cannot be shared by concurrent scans; one per thread
+        self._hs_local = threading.local()
+
+    def _hs_scratch(self):
+        scratch = getattr(self._hs_local, 'scratch', None)
+        if scratch is None:
+            scratch = self._hs_local.scratch = hyperscan.Scratch(self._hs_db)
+        return scratch
+
+    def _iter_hyperscan(self, text: str) -> Iterator[str]:
+        """Scan text in one Hyperscan pass and yield the owners of every match"""
+        scratch = self._hs_scratch()
+
+        ids = []
+        self._hs_db.scan(
+            text.encode('utf-8', 'surrogatepass'),
+            match_event_handler=lambda keyword_id, start, end, flags, context: ids.append(keyword_id),
+            scratch=scratch
+        )
+
+        owners = self._hs_owners
+        for keyword_id in ids:
+            yield from owners[keyword_id]
+
+    def _find_hyperscan(self, text: str) -> Set[str]:
+        """find() in one Hyperscan pass, halted from the match callback once every group is seen"""
+        found = set()
+        owners = self._hs_owners
+        group_count = self._group_count
+
+        def on_match(keyword_id, start, end, flags, context):
+            found.update(owners[keyword_id])
+            # A truthy return stops the scan
+            return len(found) == group_count
+
+        try:
+            self._hs_db.scan(
+                text.encode('utf-8', 'surrogatepass'),
+                match_event_handler=on_match,
+                scratch=self._hs_scratch()
+            )
+        except hyperscan.ScanTerminated:
+            pass
+        return found
+
+    def iter(self, text: str) -> Iterator[str]:
+        """
+        Yield the group of every keyword occurrence in text (overlapping matches included)
+
+        Keywords are matched as plain substrings, so callers pass lowercased text.
+        """
+        if not self._groups_of:
+            return
+
+        if self._hs_db is not None and len(text) >= HYPERSCAN_MIN_LENGTH:
+            yield from self._iter_hyperscan(text)
+        elif self._automaton is not None:
+            for _, owners in self._automaton.iter(text):
+                yield from owners
+        else:
+            for match in self._pattern.finditer(text):
+                yield from self._owners_at[match.group(1)]
+
+    def find(self, text: str) -> Set[str]:
+        """
+        Return the set of groups with at least one keyword in text
+
+        The scan stops as soon as every group has been seen, which matters for
+        long texts that hit most groups early.
+        """
+        if self._hs_db is not None and len(text) >= HYPERSCAN_MIN_LENGTH:
+            return self._find_hyperscan(text)
+
+        found = set()
+        for group in self.iter(text):
+            if group not in found:
+                found.add(group)
+                if len(found) == self._group_count:
+                    break
+        return found
+
+    @property
+    def scans_in_batches(self) -> bool:
+        """True when find_many scans all its texts in one call rather than one by one"""
+        return self._hs_db is not None
+
+    def find_many(self, texts: List[str]) -> List[Set[str]]:
+        """
+        find() for each text; with Hyperscan the texts are joined and scanned in one call
+
+        Short texts (e.g. clauses) would otherwise pay the per-scan call overhead
+        once per text.
+        """
+        if self._hs_db is None or len(texts) < 2:
+            return [self.find(text) for text in texts]
+
+        encoded = [text.encode('utf-8', 'surrogatepass') for text in texts]
+        # Byte offset where each text starts in the joined buffer
+        starts = np.zeros(len(encoded), dtype=np.int64)
+        np.cumsum([len(b) + len(_SENTINEL) for b in encoded[:-1]], out=starts[1:])
+
+        ids, ends = [], []
+        def on_match(keyword_id, start, end, flags, context):
+            ids.append(keyword_id)
+            ends.append(end)
+        self._hs_db.scan(_SENTINEL.join(encoded), match_event_handler=on_match, scratch=self._hs_scratch())
+
+        found = [set() for _ in texts]
+        if not ids:
+            return found
+
+        # end is exclusive; the match's last byte belongs to its text. Repeats of a
+        # keyword within one text collapse to a single (text, keyword) pair
+        text_idx = np.searchsorted(starts, np.array(ends, dtype=np.int64) - 1, side='right') - 1
+        pairs = np.unique(text_idx * len(self._hs_owners) + np.array(ids, dtype=np.int64))
+        owners = self._hs_owners
+        for text_i, keyword_id in zip(*divmod(pairs, len(owners))):
+            found[text_i].update(owners[keyword_id])
+        return found
+
+    def counts(self, text: str) -> Counter:
+        """Return the number of keyword occurrences per group"""
+        return Counter(self.iter(text))
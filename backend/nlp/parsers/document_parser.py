@@ -1,8 +1,91 @@
 """
 Document Parser - Extract text from PDF, DOCX, and TXT files
 """
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Union
+import multiprocessing
 import os
-from typing import Dict
+import shutil
+import tempfile
+import threading
+
+# PDFium is several times faster than PyPDF2 on text PDFs; PyPDF2 remains the fallback
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# PDFium is not thread-safe, even across separate documents; every call in this
+# process goes through this lock
+_pdfium_lock = threading.Lock()
+
+# PDFs with at least this many pages are extracted by a process pool
+PDF_PARALLEL_MIN_PAGES = 8
+PDF_PAGES_PER_WORKER = 4
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all uploads, started on the first long PDF"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # Not fork: this is a threaded server process, and a forked child could
+            # inherit locks held by other threads
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(), mp_context=multiprocessing.get_context('forkserver')
+            )
+        return _pdf_pool
+
+# A path on disk or an open binary file (e.g. the upload's BytesIO)
+Source = Union[str, BinaryIO]
+
+def _pdf_page_count(source: Source) -> int:
+    if pdfium is not None:
+        with _pdfium_lock:
+            pdf = pdfium.PdfDocument(_rewind(source))
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+    
+    import PyPDF2
+    if not isinstance(source, str):
+        return len(PyPDF2.PdfReader(_rewind(source)).pages)
+    with open(source, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+def _extract_pdf_pages(source: Source, start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop); runs in pool workers, so it opens the file itself"""
+    if pdfium is not None:
+        with _pdfium_lock:
+            pdf = pdfium.PdfDocument(_rewind(source))
+            try:
+                pages = []
+                for i in range(start, stop):
+                    page = pdf[i]
+                    textpage = page.get_textpage()
+                    pages.append(textpage.get_text_bounded().replace('\r\n', '\n'))
+                    textpage.close()
+                    page.close()
+                return pages
+            finally:
+                pdf.close()
+    
+    import PyPDF2
+    if not isinstance(source, str):
+        pdf_reader = PyPDF2.PdfReader(_rewind(source))
+        return [pdf_reader.pages[i].extract_text() for i in range(start, stop)]
+    with open(source, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [pdf_reader.pages[i].extract_text() for i in range(start, stop)]
+
+def _rewind(source: Source) -> Source:
+    """File objects are read from the start by every reader"""
+    if not isinstance(source, str):
+        source.seek(0)
+    return source
 
 class DocumentParser:
     """Parse various document formats and extract text"""
@@ -10,24 +93,28 @@ class DocumentParser:
     def __init__(self):
         self.supported_formats = ['pdf', 'docx', 'txt']
     
-    def parse(self, filepath: str, file_extension: str) -> Dict:
+    def parse(self, filepath: str, file_extension: str, fileobj: Optional[BinaryIO] = None,
+              max_pages: Optional[int] = None) -> Dict:
         """
         Parse document and extract text
         
         Args:
             filepath: Path to the document
             file_extension: File extension (pdf, docx, txt)
+            fileobj: Already-open binary contents of the document; read instead of filepath
+            max_pages: Only extract this many leading pages (PDF only), e.g. for previews
             
         Returns:
             Dict with 'success', 'text', and optional 'error'
         """
+        source = fileobj if fileobj is not None else filepath
         try:
             if file_extension == 'pdf':
-                return self._parse_pdf(filepath)
+                return self._parse_pdf(source, max_pages)
             elif file_extension == 'docx':
-                return self._parse_docx(filepath)
+                return self._parse_docx(source)
             elif file_extension == 'txt':
-                return self._parse_txt(filepath)
+                return self._parse_txt(source)
             else:
                 return {
                     'success': False,
@@ -39,39 +126,36 @@ class DocumentParser:
                 'error': f'Parsing error: {str(e)}'
             }
     
-    def _parse_pdf(self, filepath: str) -> Dict:
+    def _parse_pdf(self, source: Source, max_pages: Optional[int] = None) -> Dict:
         """Extract text from PDF (text-based only, no OCR)"""
         try:
-            import PyPDF2
+            pages = self._pdf_pages(source, max_pages)
             
-            text = ""
-            with open(filepath, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                # Check if PDF has text
-                if len(pdf_reader.pages) == 0:
-                    return {
-                        'success': False,
-                        'error': 'PDF has no pages'
-                    }
-                
-                # Extract text from all pages
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n\n"
-                
-                # Validate extraction
-                if len(text.strip()) < 100:
-                    return {
-                        'success': False,
-                        'error': 'PDF appears to be scanned/image-based. Only text-based PDFs are supported.'
-                    }
+            # Check if PDF has text
+            if not pages:
+                return {
+                    'success': False,
+                    'error': 'PDF has no pages'
+                }
+            
+            # Join once instead of growing the text page by page
+            text = "\n\n".join(page_text for page_text in pages if page_text).strip()
+            
+            # Validate extraction
+            if len(text) < 100:
+                # The first pages of a preview may be a cover sheet: judge the whole document
+                if max_pages is not None and len(pages) == max_pages:
+                    return self._parse_pdf(source)
                 
                 return {
-                    'success': True,
-                    'text': text.strip()
+                    'success': False,
+                    'error': 'PDF appears to be scanned/image-based. Only text-based PDFs are supported.'
                 }
+            
+            return {
+                'success': True,
+                'text': text
+            }
                 
         except Exception as e:
             return {
@@ -79,12 +163,39 @@ class DocumentParser:
                 'error': f'PDF parsing failed: {str(e)}'
             }
     
-    def _parse_docx(self, filepath: str) -> Dict:
+    def _pdf_pages(self, source: Source, max_pages: Optional[int] = None) -> List[str]:
+        """Text of every page (or the first max_pages); long PDFs are split into page ranges extracted in parallel"""
+        n_pages = _pdf_page_count(source)
+        if max_pages is not None:
+            n_pages = min(n_pages, max_pages)
+        workers = min(os.cpu_count() or 1, n_pages // PDF_PAGES_PER_WORKER)
+        
+        # Daemonic processes (e.g. Celery prefork children) cannot start a pool
+        if n_pages < PDF_PARALLEL_MIN_PAGES or workers < 2 or multiprocessing.current_process().daemon:
+            return _extract_pdf_pages(source, 0, n_pages)
+        
+        if isinstance(source, str):
+            return self._pdf_pages_parallel(source, n_pages, workers)
+        
+        # Pool workers reopen the file by path, so an in-memory upload is spilled to disk
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
+            shutil.copyfileobj(_rewind(source), tmp)
+        try:
+            return self._pdf_pages_parallel(tmp.name, n_pages, workers)
+        finally:
+            os.remove(tmp.name)
+    
+    def _pdf_pages_parallel(self, filepath: str, n_pages: int, workers: int) -> List[str]:
+        bounds = [n_pages * i // workers for i in range(workers + 1)]
+        chunks = _get_pdf_pool().map(_extract_pdf_pages, [filepath] * workers, bounds[:-1], bounds[1:])
+        return [page_text for chunk in chunks for page_text in chunk]
+    
+    def _parse_docx(self, source: Source) -> Dict:
         """Extract text from DOCX file"""
         try:
             from docx import Document
             
-            doc = Document(filepath)
+            doc = Document(_rewind(source))
             text = "\n\n".join([para.text for para in doc.paragraphs if para.text.strip()])
             
             if len(text.strip()) < 10:
@@ -104,11 +215,10 @@ class DocumentParser:
                 'error': f'DOCX parsing failed: {str(e)}'
             }
     
-    def _parse_txt(self, filepath: str) -> Dict:
+    def _parse_txt(self, source: Source) -> Dict:
         """Extract text from plain text file"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as file:
-                text = file.read()
+            text = self._read_text(source, 'utf-8')
             
             if len(text.strip()) < 10:
                 return {
@@ -124,8 +234,7 @@ class DocumentParser:
         except UnicodeDecodeError:
             # Try with different encoding
             try:
-                with open(filepath, 'r', encoding='latin-1') as file:
-                    text = file.read()
+                text = self._read_text(source, 'latin-1')
                 return {
                     'success': True,
                     'text': text.strip()
@@ -140,3 +249,9 @@ class DocumentParser:
                 'success': False,
                 'error': f'Text file parsing failed: {str(e)}'
             }
+    
+    def _read_text(self, source: Source, encoding: str) -> str:
+        if isinstance(source, str):
+            with open(source, 'r', encoding=encoding) as file:
+                return file.read()
+        return _rewind(source).read().decode(encoding)
@@ -0,0 +1,98 @@
+"""
+Sentence Encoder - Batched sentence embeddings from a MiniLM-style ONNX model
+
+Optional: needs onnxruntime and tokenizers, plus a model directory holding
+model.onnx and tokenizer.json, e.g. exported with
+    optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 <dir>
+and, for the int8 model (about 4x smaller and faster on CPU), quantized with
+    optimum-cli onnxruntime quantize --onnx_model <dir> --avx2 -o <dir>
+"""
+from typing import List, Optional
+import os
+import numpy as np
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
+# all-MiniLM-L6-v2 was trained on sequences up to this many tokens
+MAX_SEQ_LENGTH = 256
+
+# Looked for in this order; the int8 model written by optimum's quantizer comes first
+MODEL_FILES = ('model_quantized.onnx', 'model.onnx')
+
+def encoder_available() -> bool:
+    return ort is not None and Tokenizer is not None
+
+class SentenceEncoder:
+    """Mean-pooled, L2-normalized sentence embeddings; each batch is one forward pass"""
+
+    def __init__(self, model_dir: str, model_file: Optional[str] = None):
+        if not encoder_available():
+            raise ImportError("SentenceEncoder needs onnxruntime and tokenizers")
+        if model_file is None:
+            model_file = next(
+                (name for name in MODEL_FILES if os.path.exists(os.path.join(model_dir, name))), MODEL_FILES[-1]
+            )
+        self.model_file = model_file
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = os.cpu_count() or 1
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file), sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        # Pads each batch to its longest text, not to MAX_SEQ_LENGTH
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+    @property
+    def dimension(self) -> int:
+        """Embedding width, from the model's output shape (B, T, D)"""
+        return self.session.get_outputs()[0].shape[-1]
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Embed texts in batches
+
+        Returns:
+            (N, D) float32 matrix of L2-normalized embeddings
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        # Batch texts of similar length together so little of each batch is padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        chunks = [
+            self._encode_batch([texts[i] for i in order[start:start + batch_size]])
+            for start in range(0, len(order), batch_size)
+        ]
+        embeddings = np.empty((len(texts), chunks[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.vstack(chunks)
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return np.divide(embeddings, norms, out=np.zeros_like(embeddings), where=norms > 0)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': mask
+        }
+        if 'token_type_ids' in self._input_names:
+            feeds['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        # First output is the last hidden state, (B, T, D); average over real tokens
+        hidden = self.session.run(None, feeds)[0]
+        weights = mask[:, :, None].astype(hidden.dtype)
+        return (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
@@ -1,48 +1,266 @@
 """
 Clause Similarity - Compare clauses against standard templates
+
+Texts are embedded with the sentence encoder when one is configured
+(SIMILARITY_ONNX_MODEL); otherwise the spaCy model's static word vectors
+(doc.vector) are used, so texts are only tokenized and every pipeline
+component is disabled.
 """
-import spacy
+from collections import OrderedDict
+import hashlib
+import threading
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+
+from spacy.language import Language
+
+from ._registry import PIPE_BATCH_SIZE, get_nlp, get_sentence_encoder
+from .sentence_encoder import SentenceEncoder
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
 
 class ClauseSimilarity:
     """Compare clauses using semantic similarity"""
     
-    def __init__(self):
-        try:
-            self.nlp = spacy.load("en_core_web_lg")
-        except:
-            self.nlp = None
-            print("Warning: en_core_web_lg not found. Similarity matching will be disabled.")
+    # Number of distinct templates whose embedded standards are kept
+    STANDARDS_CACHE_SIZE = 32
+    
+    # With int8_standards, the templates in active use are also kept widened to
+    # float32 so compare_batch does not convert them on every call
+    WIDENED_CACHE_SIZE = 4
+    
+    # Number of individual text embeddings kept (clauses recur across similar contracts)
+    EMBEDDING_CACHE_SIZE = 10000
+    
+    # Number of compare_to_standard results kept, by (clause, standards)
+    RESULT_CACHE_SIZE = 10000
+    
+    # Best-match scores in [low, high) are deviations, at or above high standard; the
+    # encoder's upper bound is the one calibrated for all-MiniLM-L6-v2
+    SPACY_DEVIANCE_RANGE = (0.6, 0.9)
+    ENCODER_DEVIANCE_RANGE = (0.6, 0.87)
+    
+    def __init__(self, nlp: Optional[Language] = None, encoder: Optional[SentenceEncoder] = None,
+                 int8_standards: bool = False):
+        # Shared models (loaded once per process) unless passed in; the encoder takes precedence
+        self.encoder = encoder if encoder is not None else get_sentence_encoder()
+        # Without an encoder the spaCy model is loaded on first use (see nlp)
+        self._nlp = nlp
+        self._nlp_resolved = nlp is not None or self.encoder is not None
+        self.deviance_range = self.ENCODER_DEVIANCE_RANGE if self.encoder is not None else self.SPACY_DEVIANCE_RANGE
+        
+        # Store standard matrices as int8 with a per-row scale (4x smaller); scores
+        # then differ from float32 by well under 0.01. Only templates outside the
+        # WIDENED_CACHE_SIZE most recently used ones are held as int8 alone.
+        self.int8_standards = int8_standards
+        
+        # Normalized standard-clause matrices (and int8 row scales), keyed by the template's clauses
+        self._std_cache: 'OrderedDict[Tuple[str, ...], Tuple[np.ndarray, Optional[np.ndarray]]]' = OrderedDict()
+        self._widened_cache: 'OrderedDict[Tuple[str, ...], np.ndarray]' = OrderedDict()
+        self._std_lock = threading.Lock()
+        
+        # Normalized embeddings by text digest
+        self._vec_cache: 'OrderedDict[bytes, np.ndarray]' = OrderedDict()
+        self._vec_lock = threading.Lock()
+        
+        # compare_to_standard results by (clause digest, standards digest)
+        self._result_cache: 'OrderedDict[Tuple[bytes, bytes], Dict]' = OrderedDict()
+        self._result_lock = threading.Lock()
+    
+    @property
+    def nlp(self) -> Optional[Language]:
+        """spaCy pipeline for the word vectors; None when an encoder is used or the model is missing"""
+        if not self._nlp_resolved:
+            self._nlp = get_nlp()
+            self._nlp_resolved = True
+            if self._nlp is None:
+                print("Warning: en_core_web_lg not found. Similarity matching will be disabled.")
+        return self._nlp
     
     def compare_to_standard(self, clause_text: str, standard_clauses: List[str]) -> Dict:
         """
         Compare a clause against a list of standard clauses to find best match and deviation.
         
         Returns:
-            Dict with 'match_score' (0-1), 'best_match_text', 'is_deviant'
+            Dict with 'match_score' (0-1), 'best_match_text', 'is_deviant', 'is_standard'
         """
-        if not self.nlp or not clause_text.strip():
-            return {'match_score': 0, 'best_match_text': '', 'is_deviant': False}
-            
-        doc1 = self.nlp(clause_text)
+        # Identical clauses recur across contracts of the same template
+        key = (_digest(clause_text), b''.join(_digest(standard) for standard in standard_clauses))
+        with self._result_lock:
+            if key in self._result_cache:
+                self._result_cache.move_to_end(key)
+                return dict(self._result_cache[key])
+        
+        result = self.compare_many([clause_text], standard_clauses)[0]
+        
+        with self._result_lock:
+            self._result_cache[key] = dict(result)
+            while len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+        return result
+    
+    def compare_many(self, clauses: List[str], standard_clauses: List[str], batch_size: int = PIPE_BATCH_SIZE) -> List[Dict]:
+        """
+        Compare every clause against the standard clauses, parsing the clauses in one nlp.pipe pass
+        
+        Returns:
+            One result per clause, in the same order (see compare_to_standard)
+        """
+        # Blank clauses are not embedded; they never match
+        to_embed = [i for i, text in enumerate(clauses) if text.strip()]
+        if (self.encoder is None and not self.nlp) or not standard_clauses or not to_embed:
+            return [self._no_match() for _ in clauses]
+        
+        embedded = self._embed([clauses[i] for i in to_embed], batch_size)
+        clause_vectors = np.zeros((len(clauses), embedded.shape[1]), dtype=np.float32)
+        clause_vectors[to_embed] = embedded
+        
+        return self.compare_batch(clause_vectors, standard_clauses)
+    
+    def load_standards(self, standard_clauses: List[str]) -> np.ndarray:
+        """
+        Embed standard clauses once; templates are static, so the matrix is reused across calls
         
-        best_score = 0
-        best_match = ""
+        Returns:
+            (M, D) float32 matrix of L2-normalized standard clause vectors
+        """
+        matrix, scales = self._load_standards(standard_clauses)
+        if scales is None:
+            return matrix
+        
+        key = tuple(standard_clauses)
+        with self._std_lock:
+            if key in self._widened_cache:
+                self._widened_cache.move_to_end(key)
+                return self._widened_cache[key]
+        
+        widened = matrix * scales[:, None]
+        widened.flags.writeable = False
+        
+        with self._std_lock:
+            self._widened_cache[key] = widened
+            while len(self._widened_cache) > self.WIDENED_CACHE_SIZE:
+                self._widened_cache.popitem(last=False)
+        
+        return widened
+    
+    def _load_standards(self, standard_clauses: List[str]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Cached (matrix, scales); scales is None for float32 matrices"""
+        key = tuple(standard_clauses)
+        with self._std_lock:
+            if key in self._std_cache:
+                self._std_cache.move_to_end(key)
+                return self._std_cache[key]
         
-        for std in standard_clauses:
-            doc2 = self.nlp(std)
-            score = doc1.similarity(doc2)
-            if score > best_score:
-                best_score = score
-                best_match = std
+        matrix = self._embed(list(key))
+        entry = self._quantize(matrix) if self.int8_standards else (matrix, None)
+        for array in entry:
+            if array is not None:
+                array.flags.writeable = False
+        
+        with self._std_lock:
+            self._std_cache[key] = entry
+            while len(self._std_cache) > self.STANDARDS_CACHE_SIZE:
+                self._std_cache.popitem(last=False)
+        
+        return entry
+    
+    def compare_batch(self, clause_vectors: np.ndarray, standard_clauses: List[str]) -> List[Dict]:
+        """
+        Score L2-normalized clause vectors against the standard clauses with one matrix product
+        
+        Returns:
+            One result per row of clause_vectors (see compare_to_standard)
+        """
+        # numpy has no fast int8 matmul, so int8 standards are scored from their cached float32 widening
+        std_matrix = self.load_standards(standard_clauses)
+        # float32 and C-contiguous, so numpy hands the product to BLAS sgemm rather
+        # than upcasting to float64 or copying a strided input
+        clause_vectors = np.ascontiguousarray(clause_vectors, dtype=np.float32)
+        scores = clause_vectors @ std_matrix.T
+        best_idx = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(scores)), best_idx]
         
         # If score is high (e.g. > 0.85), it's standard.
         # If score is medium (e.g. 0.6 - 0.85), it might be a deviation.
         # If score is low, it's a completely different clause.
+        # Only a positive similarity counts as a match.
+        matched = best_scores > 0
+        low, high = self.deviance_range
+        deviant = (best_scores >= low) & (best_scores < high)  # Similar but not quite right
+        standard = best_scores >= high
+        
+        results = []
+        for idx, best_score, is_match, is_deviant, is_standard in zip(best_idx.tolist(), best_scores.tolist(),
+                                                                       matched.tolist(), deviant.tolist(),
+                                                                       standard.tolist()):
+            if not is_match:
+                results.append(self._no_match())
+                continue
+            
+            results.append({
+                'match_score': best_score,
+                'best_match_text': standard_clauses[idx],
+                'is_deviant': is_deviant,
+                'is_standard': is_standard
+            })
+        
+        return results
+    
+    def _embed(self, texts: List[str], batch_size: int = PIPE_BATCH_SIZE) -> np.ndarray:
+        """(N, D) float32 matrix of L2-normalized embeddings; only texts not seen recently are embedded"""
+        keys = [_digest(text) for text in texts]
+        
+        rows: Dict[bytes, np.ndarray] = {}
+        with self._vec_lock:
+            for key in keys:
+                if key in self._vec_cache:
+                    self._vec_cache.move_to_end(key)
+                    rows[key] = self._vec_cache[key]
+        
+        # Each distinct missing text is embedded once, all in one batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in rows:
+                missing.setdefault(key, text)
+        if missing:
+            embedded = self._embed_uncached(list(missing.values()), batch_size)
+            with self._vec_lock:
+                for key, vector in zip(missing, embedded):
+                    # Copied so a cached row does not keep its whole batch alive
+                    rows[key] = self._vec_cache[key] = vector.copy()
+                while len(self._vec_cache) > self.EMBEDDING_CACHE_SIZE:
+                    self._vec_cache.popitem(last=False)
         
-        return {
-            'match_score': float(best_score),
-            'best_match_text': best_match,
-            'is_deviant': 0.6 <= best_score < 0.9  # Flag if it looks similar but not quite right
-        }
+        if not keys:
+            return self._embed_uncached([], batch_size)
+        return np.vstack([rows[key] for key in keys])
+    
+    def _embed_uncached(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Embed texts with the encoder or spaCy vectors"""
+        if self.encoder is not None:
+            return self.encoder.encode(texts, batch_size=batch_size)
+        
+        vectors = np.zeros((len(texts), self._vector_width()), dtype=np.float32)
+        for i, doc in enumerate(self.nlp.pipe(texts, batch_size=batch_size, disable=self.nlp.pipe_names)):
+            vectors[i] = doc.vector
+        return self._normalize(vectors)
+    
+    def _quantize(self, matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Symmetric per-row int8 quantization: row ~= q * scale"""
+        scales = np.abs(matrix).max(axis=1) / 127 if len(matrix) else np.zeros(0, dtype=np.float32)
+        safe = np.where(scales > 0, scales, 1)
+        q = np.round(matrix / safe[:, None]).astype(np.int8)
+        return q, scales.astype(np.float32)
+    
+    def _normalize(self, vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows; all-zero rows (no known words) stay zero"""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    
+    def _vector_width(self) -> int:
+        return self.nlp.vocab.vectors.shape[1]
+    
+    def _no_match(self) -> Dict:
+        return {'match_score': 0, 'best_match_text': '', 'is_deviant': False, 'is_standard': False}
@@ -0,0 +1,147 @@
+"""
+Analysis Pipeline - Run the full contract analysis outside of a request context
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Tuple
+import asyncio
+import os
+
+import orjson
+
+from .nlp._registry import get_classifier, get_clause_extractor, get_entity_extractor, get_similarity
+from .llm.risk_scorer import RiskScorer
+from .llm.explainer import Explainer
+from .utils.audit_logger import log_action
+
+TEMPLATE_DIR = 'data/templates'
+
+# Used when there is no template for the detected contract type, just for demo
+DEFAULT_TEMPLATE = 'employment'
+
+# Parsed templates by path, with the mtime they were read at
+_TEMPLATE_CACHE: Dict[str, Tuple[int, Dict]] = {}
+
+# With the ONNX sentence encoder, clause embeddings are computed on a worker thread
+# while spaCy runs NER (onnxruntime releases the GIL). Nothing else overlaps: the
+# default spaCy-vector path only tokenizes, which holds the GIL, so it runs exactly
+# as before, as do short contracts. Document parsing is not overlapped with NER
+# either; it happens at upload, and clauses can only be split from the whole text.
+OVERLAP_MIN_CLAUSES = 8
+_similarity_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='clause-similarity')
+
+def load_template(contract_type: str) -> Dict:
+    """
+    Standard template for a contract type, re-read only when the file changes
+    
+    Returns:
+        Parsed template JSON, or {} when neither it nor the default template exists
+    """
+    for name in (contract_type, DEFAULT_TEMPLATE):
+        template_path = os.path.join(TEMPLATE_DIR, f"{name}_template.json")
+        try:
+            mtime = os.stat(template_path).st_mtime_ns
+        except FileNotFoundError:
+            continue
+        
+        cached = _TEMPLATE_CACHE.get(template_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        
+        with open(template_path, 'rb') as f:
+            template_data = orjson.loads(f.read())
+        _TEMPLATE_CACHE[template_path] = (mtime, template_data)
+        return template_data
+    
+    return {}
+
+def run_analysis(contract_id: str, text: str, use_llm: bool = False, include_full_text: bool = False) -> Dict:
+    """
+    Classify, segment, score and explain a contract
+    
+    Used by the analyze route and by the Celery worker. Clause full_text
+    (header + text) is only included when include_full_text is set.
+    
+    Returns:
+        Analysis result as returned by /api/analyze
+    """
+    # Lowercase once; every keyword scan works on the lowercased text
+    text_lower = text.lower()
+    
+    # Step 1: Classify contract type
+    classifier = get_classifier()
+    contract_type = classifier.classify(text, text_lower)
+    
+    # Step 2: Extract clauses
+    clause_extractor = get_clause_extractor()
+    clauses = clause_extractor.extract(text)
+    
+    # Step 3: Extract entities from each clause
+    entity_extractor = get_entity_extractor()
+    
+    # [NEW] Load standard template for comparison
+    similarity_checker = get_similarity()
+    standard_clauses = []
+    try:
+        standard_clauses = load_template(contract_type).get('clauses', [])
+    except Exception as e:
+        print(f"Error loading template: {e}")
+
+    # Entities and similarity for every clause in batched passes
+    texts = [clause.text for clause in clauses]
+    sim_future = None
+    if standard_clauses and similarity_checker.encoder is not None and len(texts) >= OVERLAP_MIN_CLAUSES:
+        sim_future = _similarity_pool.submit(similarity_checker.compare_many, texts, standard_clauses)
+    
+    entities = entity_extractor.extract_columns(texts)
+    
+    if sim_future is not None:
+        sim_results = sim_future.result()
+    elif standard_clauses:
+        sim_results = similarity_checker.compare_many(texts, standard_clauses)
+    else:
+        sim_results = [None] * len(clauses)
+    
+    for clause, clause_entities, sim_result in zip(clauses, entities, sim_results):
+        clause.entities = clause_entities
+        
+        # [NEW] Check similarity
+        if sim_result is not None:
+            clause.similarity_score = sim_result['match_score']
+            clause.is_standard = sim_result['is_standard']
+            clause.deviation_flag = sim_result['is_deviant']
+            if sim_result['is_deviant']:
+                clause.suggested_standard = sim_result['best_match_text']
+    
+    # Step 4: Risk scoring (LLM scoring fans out concurrently across clauses)
+    risk_scorer = RiskScorer()
+    if use_llm and risk_scorer.client:
+        risk_analysis = asyncio.run(risk_scorer.score_contract_async(contract_type, clauses))
+    else:
+        risk_analysis = risk_scorer.score_contract(contract_type, clauses)
+    
+    # Step 5: Generate plain-language explanations
+    explainer = Explainer()
+    explanations = explainer.explain_contract(contract_type, clauses, risk_analysis)
+    
+    # Combine results
+    result = {
+        'contract_id': contract_id,
+        'contract_type': contract_type,
+        'risk_score': risk_analysis['composite_score'],
+        'risk_level': risk_analysis['risk_level'],
+        'clauses': [clause.to_dict(include_full_text) for clause in clauses],
+        'risk_flags': risk_analysis['flags'],
+        'summary': explanations['summary'],
+        'recommendations': explanations['recommendations'],
+        'timestamp': datetime.now().isoformat()
+    }
+    
+    # Log action
+    log_action(contract_id, 'analyze', {
+        'contract_type': contract_type,
+        'risk_score': risk_analysis['composite_score'],
+        'clause_count': len(clauses)
+    })
+    
+    return result
@@ -1,18 +1,17 @@
 """
 Analyze route - Process contracts and generate risk assessments
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from datetime import datetime
-
-from nlp.extractors.entity_extractor import EntityExtractor
-from nlp.extractors.clause_extractor import ClauseExtractor
-from nlp.classifiers.contract_classifier import ContractClassifier
-from nlp.similarity import ClauseSimilarity  # [NEW]
-from llm.risk_scorer import RiskScorer
-from llm.explainer import Explainer
-from utils.audit_logger import log_action
 import json
-import os
+
+from ..nlp._registry import get_entity_extractor
+from ..llm.risk_scorer import RiskScorer
+from ..llm.batcher import get_clause_batcher
+from ..llm.explainer import Explainer
+from ..pipeline import run_analysis
+from ..tasks import analyze_contract_task, celery_app, CPU_QUEUE, LLM_QUEUE
+from ..utils.contract_store import load_text
 
 analyze_bp = Blueprint('analyze', __name__)
 
@@ -20,83 +19,24 @@ analyze_bp = Blueprint('analyze', __name__)
 def analyze_contract():
     """
     Analyze a contract and return risk assessment
-    Expected input: contract_id, text
+    Expected input: contract_id, optional text (defaults to the uploaded text), optional use_llm
+    Query: ?full_text=1 to include each clause's header + text
     """
     try:
         data = request.get_json()
         
-        if not data or 'contract_id' not in data or 'text' not in data:
-            return jsonify({'error': 'Missing contract_id or text'}), 400
+        if not data or 'contract_id' not in data:
+            return jsonify({'error': 'Missing contract_id'}), 400
         
         contract_id = data['contract_id']
-        text = data['text']
-        
-        # Step 1: Classify contract type
-        classifier = ContractClassifier()
-        contract_type = classifier.classify(text)
-        
-        # Step 2: Extract clauses
-        clause_extractor = ClauseExtractor()
-        clauses = clause_extractor.extract(text)
-        
-        # Step 3: Extract entities from each clause
-        entity_extractor = EntityExtractor()
-        
-        # [NEW] Load standard template for comparison
-        similarity_checker = ClauseSimilarity()
-        standard_clauses = []
-        try:
-            template_path = f"data/templates/{contract_type}_template.json"
-            # Fallback to general employment if specific not found, just for demo
-            if not os.path.exists(template_path):
-                 template_path = "data/templates/employment_template.json"
-            
-            if os.path.exists(template_path):
-                with open(template_path, 'r') as f:
-                    template_data = json.load(f)
-                    standard_clauses = template_data.get('clauses', [])
-        except Exception as e:
-            print(f"Error loading template: {e}")
-
-        for clause in clauses:
-            clause['entities'] = entity_extractor.extract(clause['text'])
-            
-            # [NEW] Check similarity
-            if standard_clauses:
-                sim_result = similarity_checker.compare_to_standard(clause['text'], standard_clauses)
-                clause['similarity_score'] = sim_result['match_score']
-                clause['is_standard'] = sim_result['match_score'] > 0.9
-                clause['deviation_flag'] = sim_result['is_deviant']
-                if sim_result['is_deviant']:
-                    clause['suggested_standard'] = sim_result['best_match_text']
-        
-        # Step 4: Risk scoring
-        risk_scorer = RiskScorer()
-        risk_analysis = risk_scorer.score_contract(contract_type, clauses)
-        
-        # Step 5: Generate plain-language explanations
-        explainer = Explainer()
-        explanations = explainer.explain_contract(contract_type, clauses, risk_analysis)
-        
-        # Combine results
-        result = {
-            'contract_id': contract_id,
-            'contract_type': contract_type,
-            'risk_score': risk_analysis['composite_score'],
-            'risk_level': risk_analysis['risk_level'],
-            'clauses': clauses,
-            'risk_flags': risk_analysis['flags'],
-            'summary': explanations['summary'],
-            'recommendations': explanations['recommendations'],
-            'timestamp': datetime.now().isoformat()
-        }
+        text = _contract_text(data)
+        if text is None:
+            return jsonify({'error': 'Missing text and no uploaded contract with this id'}), 404
         
-        # Log action
-        log_action(contract_id, 'analyze', {
-            'contract_type': contract_type,
-            'risk_score': risk_analysis['composite_score'],
-            'clause_count': len(clauses)
-        })
+        use_llm = bool(data.get('use_llm', False))
+        
+        result = run_analysis(contract_id, text, use_llm=use_llm,
+                              include_full_text=_wants_full_text())
         
         return jsonify(result), 200
         
@@ -106,6 +46,95 @@ def analyze_contract():
             'details': str(e)
         }), 500
 
+@analyze_bp.route('/async', methods=['POST'])
+def analyze_contract_async():
+    """
+    Queue a contract for analysis on a Celery worker
+    Expected input: contract_id, optional text (defaults to the uploaded text), optional use_llm
+    Query: ?full_text=1 to include each clause's header + text
+    Returns: job_id to poll via /status/<job_id>
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or 'contract_id' not in data:
+            return jsonify({'error': 'Missing contract_id'}), 400
+        
+        text = _contract_text(data)
+        if text is None:
+            return jsonify({'error': 'Missing text and no uploaded contract with this id'}), 404
+        
+        use_llm = bool(data.get('use_llm', False))
+        task = analyze_contract_task.apply_async(
+            args=(data['contract_id'], text, use_llm, _wants_full_text()),
+            queue=LLM_QUEUE if use_llm else CPU_QUEUE
+        )
+        
+        return jsonify({
+            'job_id': task.id,
+            'contract_id': data['contract_id'],
+            'timestamp': datetime.now().isoformat()
+        }), 202
+        
+    except Exception as e:
+        return jsonify({
+            'error': 'Failed to queue analysis',
+            'details': str(e)
+        }), 500
+
+@analyze_bp.route('/status/<job_id>', methods=['GET'])
+def analysis_status(job_id):
+    """
+    Poll a queued analysis; includes the result once the job has finished
+    """
+    try:
+        task = celery_app.AsyncResult(job_id)
+        response = {'job_id': job_id, 'state': task.state}
+        
+        if task.successful():
+            response['result'] = task.result
+        elif task.failed():
+            response['error'] = str(task.result)
+        
+        return jsonify(response), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': 'Status lookup failed',
+            'details': str(e)
+        }), 500
+
+@analyze_bp.route('/summary/stream', methods=['POST'])
+def stream_summary():
+    """
+    Stream the contract summary as Server-Sent Events
+    Expected input: contract_type, clauses, risk_score, risk_level, risk_flags
+    (the fields returned by POST /)
+    """
+    data = request.get_json()
+    
+    if not data or 'clauses' not in data:
+        return jsonify({'error': 'Missing clauses'}), 400
+    
+    clauses = data['clauses']
+    contract_type = data.get('contract_type', 'general')
+    risk_analysis = {
+        'composite_score': data.get('risk_score', 0),
+        'risk_level': data.get('risk_level', 'low'),
+        'flags': data.get('risk_flags', []),
+        'high_risk_clauses': sum(1 for c in clauses if c.get('risk_level') == 'high')
+    }
+    
+    def generate():
+        for event in Explainer().stream_contract_explanation(contract_type, clauses, risk_analysis):
+            if 'delta' in event:
+                yield f"data: {json.dumps(event)}\n\n"
+            else:
+                yield f"event: done\ndata: {json.dumps(event)}\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @analyze_bp.route('/clause/<clause_id>', methods=['POST'])
 def analyze_clause(clause_id):
     """
@@ -121,16 +150,15 @@ def analyze_clause(clause_id):
         contract_type = data.get('contract_type', 'general')
         
         # Extract entities
-        entity_extractor = EntityExtractor()
+        entity_extractor = get_entity_extractor()
         entities = entity_extractor.extract(clause_text)
         
         # Risk scoring for single clause
         risk_scorer = RiskScorer()
         clause_risk = risk_scorer.score_clause(clause_text, contract_type)
         
-        # Generate explanation
-        explainer = Explainer()
-        explanation = explainer.explain_clause(clause_text, clause_risk)
+        # Generate explanation (batched with concurrent clause requests)
+        explanation = get_clause_batcher().submit(clause_text, clause_risk)
         
         return jsonify({
             'clause_id': clause_id,
@@ -148,3 +176,13 @@ def analyze_clause(clause_id):
             'error': 'Clause analysis failed',
             'details': str(e)
         }), 500
+
+def _contract_text(data: dict):
+    """Text sent with the request, else the text saved when the contract was uploaded"""
+    if 'text' in data:
+        return data['text']
+    return load_text(data['contract_id'])
+
+def _wants_full_text() -> bool:
+    """True when the client asked for clause full_text via ?full_text=1"""
+    return request.args.get('full_text', '').lower() in ('1', 'true', 'yes')
@@ -5,9 +5,9 @@ from flask import Blueprint, request, jsonify, send_file
 from datetime import datetime
 import os
 
-from utils.pdf_generator import generate_report
-from utils.audit_logger import log_action
-from llm.explainer import Explainer
+from ..utils.pdf_generator import generate_report
+from ..utils.audit_logger import log_action
+from ..llm.explainer import Explainer
 
 export_bp = Blueprint('export', __name__)
 
@@ -4,16 +4,25 @@ Upload route - Handle contract file uploads
 from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
 import os
+import shutil
 import uuid
 from datetime import datetime
 
-from nlp.parsers.document_parser import DocumentParser
-from utils.audit_logger import log_action
+from ..nlp.parsers.document_parser import DocumentParser
+from ..utils.audit_logger import log_action
+from ..utils.contract_store import UPLOAD_DIR, save_text
 
 upload_bp = Blueprint('upload', __name__)
 
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'txt'}
 
+# Uploads are streamed to disk in chunks of this size, so no request holds the whole file
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# PDF pages parsed for ?preview_only=1; analysis later parses the whole saved file
+PREVIEW_PAGES = 3
+PREVIEW_CHARS = 500
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -22,7 +31,10 @@ def allowed_file(filename):
 def upload_contract():
     """
     Upload and parse a contract document
+    Query: ?preview_only=1 to parse just the first pages and return only text_preview
     Returns: contract_id, extracted_text, file_info
+    
+    The full text is kept on disk, so /api/analyze can be called with just the contract_id.
     """
     try:
         # Check if file is present
@@ -47,14 +59,16 @@ def upload_contract():
         file_extension = filename.rsplit('.', 1)[1].lower()
         
         # Save file with contract ID
-        upload_folder = 'data/uploads'
-        os.makedirs(upload_folder, exist_ok=True)
-        filepath = os.path.join(upload_folder, f"{contract_id}.{file_extension}")
-        file.save(filepath)
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        filepath = os.path.join(UPLOAD_DIR, f"{contract_id}.{file_extension}")
+        _save_upload(file.stream, filepath)
         
-        # Parse document
+        preview_only = request.args.get('preview_only', '').lower() in ('1', 'true', 'yes')
+        
+        # Parse the saved file (just written, so it is read back from the page cache)
         parser = DocumentParser()
-        parsed_data = parser.parse(filepath, file_extension)
+        parsed_data = parser.parse(filepath, file_extension,
+                                   max_pages=PREVIEW_PAGES if preview_only else None)
         
         if not parsed_data['success']:
             return jsonify({
@@ -62,6 +76,26 @@ def upload_contract():
                 'details': parsed_data.get('error', 'Unknown error')
             }), 400
         
+        # Only PDFs are cut short for previews; DOCX/TXT text is complete, so keep it
+        if not preview_only or file_extension != 'pdf':
+            save_text(contract_id, parsed_data['text'])
+        
+        if preview_only:
+            log_action(contract_id, 'upload', {
+                'filename': filename,
+                'file_type': file_extension,
+                'preview_only': True
+            })
+            
+            return jsonify({
+                'success': True,
+                'contract_id': contract_id,
+                'filename': filename,
+                'file_type': file_extension,
+                'text_preview': parsed_data['text'][:PREVIEW_CHARS],
+                'timestamp': datetime.now().isoformat()
+            }), 200
+        
         # Log action
         log_action(contract_id, 'upload', {
             'filename': filename,
@@ -76,7 +110,7 @@ def upload_contract():
             'file_type': file_extension,
             'text_length': len(parsed_data['text']),
             'text': parsed_data['text'],
-            'text_preview': parsed_data['text'][:500],  # First 500 chars
+            'text_preview': parsed_data['text'][:PREVIEW_CHARS],  # First 500 chars
             'timestamp': datetime.now().isoformat()
         }), 200
         
@@ -85,3 +119,8 @@ def upload_contract():
             'error': 'Upload failed',
             'details': str(e)
         }), 500
+
+def _save_upload(stream, filepath: str):
+    """Write the upload to filepath in COPY_CHUNK_SIZE chunks"""
+    with open(filepath, 'wb') as dst:
+        shutil.copyfileobj(stream, dst, length=COPY_CHUNK_SIZE)
@@ -0,0 +1,36 @@
+"""
+Background Tasks - Run contract analysis on Celery workers
+
+Start workers from the project root, one pool per queue:
+    celery -A backend.tasks worker -Q cpu --concurrency=8
+    celery -A backend.tasks worker -Q llm --concurrency=8
+"""
+from celery import Celery
+from celery.signals import worker_process_init
+from dotenv import load_dotenv
+import os
+
+from .nlp._registry import preload as preload_models
+from .pipeline import run_analysis
+
+load_dotenv()
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+# Queue names: LLM-heavy analyses are kept apart from keyword-only ones
+CPU_QUEUE = 'cpu'
+LLM_QUEUE = 'llm'
+
+celery_app = Celery('contract', broker=REDIS_URL, backend=os.getenv('CELERY_RESULT_BACKEND', REDIS_URL))
+celery_app.conf.task_default_queue = CPU_QUEUE
+
+@worker_process_init.connect
+def _preload_models(**kwargs):
+    """Load the NLP models once in each worker process instead of on its first task"""
+    preload_models()
+
+@celery_app.task(name='analyze_contract')
+def analyze_contract_task(contract_id: str, text: str, use_llm: bool = False,
+                          include_full_text: bool = False) -> dict:
+    """Run the full analysis pipeline for one contract"""
+    return run_analysis(contract_id, text, use_llm=use_llm, include_full_text=include_full_text)
@@ -1,10 +1,51 @@
 """
 Audit Logger - Log all user actions for compliance
+
+Entries are appended to daily JSONL files (the human-readable audit trail) by a
+background writer thread, started on first use in each process, which also
+indexes them by contract in SQLite so history lookups do not scan every log file.
 """
-import json
+import atexit
+import mmap
 import os
+import pickle
+import queue
+import re
+import sqlite3
+import threading
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List, Optional, Set, Tuple
+
+import orjson
+
+LOG_DIR = 'data/audit_logs'
+INDEX_PATH = os.path.join(LOG_DIR, 'index.sqlite')
+
+# Which log files mention which contracts, for the file-scan fallback
+FILE_INDEX_PATH = os.path.join(LOG_DIR, '.index.pickle')
+
+# Created by a writer that could not index its entries (e.g. the index was locked);
+# history scans the log files until the next writer to open the index rebuilds it
+STALE_MARKER_PATH = os.path.join(LOG_DIR, '.index_stale')
+
+# Maximum entries written per file open / SQLite transaction
+WRITE_BATCH_SIZE = 100
+
+# Keep json.dumps' acceptance of non-string metadata keys
+_DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+_log_queue: 'queue.Queue[Dict]' = queue.Queue()
+
+# Started on first use in each process (see _ensure_writer)
+_writer: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+# Matches both json.dumps ("key": "v") and orjson ("key":"v") output
+_CONTRACT_ID_RE = re.compile(rb'"contract_id":\s*"([^"]*)"')
+
+# filename -> (mtime_ns, size, contract ids in the file)
+_file_index: Dict[str, Tuple[int, int, Set[str]]] = {}
+_file_index_lock = threading.Lock()
 
 def log_action(contract_id: str, action: str, metadata: Dict = None):
     """
@@ -15,9 +56,6 @@ def log_action(contract_id: str, action: str, metadata: Dict = None):
         action: Action type (upload, analyze, export, etc.)
         metadata: Additional context
     """
-    log_dir = 'data/audit_logs'
-    os.makedirs(log_dir, exist_ok=True)
-    
     log_entry = {
         'timestamp': datetime.now().isoformat(),
         'contract_id': contract_id,
@@ -25,37 +63,297 @@ def log_action(contract_id: str, action: str, metadata: Dict = None):
         'metadata': metadata or {}
     }
     
-    # Append to daily log file
-    date_str = datetime.now().strftime('%Y-%m-%d')
-    log_file = os.path.join(log_dir, f'audit_{date_str}.jsonl')
-    
-    try:
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(log_entry) + '\n')
-    except Exception as e:
-        print(f"Failed to log action: {e}")
+    # Written by the background thread; the request does not wait on the filesystem
+    _ensure_writer()
+    _log_queue.put(log_entry)
+
+def flush():
+    """Block until every queued entry has been written"""
+    if _writer is None and _log_queue.empty():
+        # Nothing logged in this process; at exit a thread could not be started anyway
+        return
+    _ensure_writer()
+    _log_queue.join()
+
+def _ensure_writer():
+    """Start this process's writer thread if it is not running"""
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_log_writer, name='audit-log-writer', daemon=True)
+            _writer.start()
+
+def _reset_after_fork():
+    """
+    A forked child (e.g. a Celery prefork worker) has no writer thread, and the
+    queue or its lock may have been copied mid-use; start over with fresh ones
+    """
+    global _log_queue, _writer, _writer_lock
+    _log_queue = queue.Queue()
+    _writer = None
+    _writer_lock = threading.Lock()
 
 def get_contract_history(contract_id: str) -> list:
     """
     Retrieve audit history for a specific contract
     """
-    log_dir = 'data/audit_logs'
+    flush()
+    
+    if os.path.exists(INDEX_PATH) and not os.path.exists(STALE_MARKER_PATH):
+        try:
+            with sqlite3.connect(INDEX_PATH, timeout=30) as conn:
+                rows = conn.execute(
+                    'SELECT entry FROM entries WHERE contract_id = ? ORDER BY timestamp',
+                    (contract_id,)
+                ).fetchall()
+            return [orjson.loads(row[0]) for row in rows]
+        except sqlite3.Error as e:
+            print(f"Audit index lookup failed, scanning log files: {e}")
+    
+    return _scan_log_files(contract_id)
+
+def _scan_log_files(contract_id: str) -> list:
+    """Search the daily log files that mention the contract (used when the SQLite index is unavailable)"""
     history = []
     
-    if not os.path.exists(log_dir):
+    if not os.path.exists(LOG_DIR):
         return history
     
-    # Search all log files
-    for filename in os.listdir(log_dir):
-        if filename.endswith('.jsonl'):
-            filepath = os.path.join(log_dir, filename)
+    # Only lines containing the contract id are parsed
+    encoded_id = orjson.dumps(contract_id)
+    needles = (b'"contract_id": ' + encoded_id, b'"contract_id":' + encoded_id)
+    
+    for filename in _files_mentioning(contract_id):
+        filepath = os.path.join(LOG_DIR, filename)
+        try:
+            history.extend(_entries_matching(filepath, needles, contract_id))
+        except Exception as e:
+            print(f"Failed to read log file {filename}: {e}")
+    
+    return sorted(history, key=lambda x: x['timestamp'])
+
+def _entries_matching(filepath: str, needles: Tuple[bytes, ...], contract_id: str) -> List[Dict]:
+    """Parse the lines of a log file that contain any needle, found with mmap.find"""
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            line_starts = set()
+            for needle in needles:
+                pos = mm.find(needle)
+                while pos != -1:
+                    start = mm.rfind(b'\n', 0, pos) + 1
+                    end = mm.find(b'\n', pos)
+                    if end == -1:
+                        end = len(mm)
+                    line_starts.add((start, end))
+                    pos = mm.find(needle, end)
+            
+            entries = []
+            for start, end in sorted(line_starts):
+                # Skip a line cut short by a crash, like the SQLite backfill does
+                try:
+                    entry = orjson.loads(mm[start:end])
+                except ValueError:
+                    continue
+                # The needle could also sit inside metadata
+                if entry.get('contract_id') == contract_id:
+                    entries.append(entry)
+            return entries
+
+def _files_mentioning(contract_id: str) -> List[str]:
+    """
+    Log files containing the contract, from a per-file index of contract ids
+    
+    Only files that are new or changed since the index was saved are rescanned.
+    """
+    with _file_index_lock:
+        if not _file_index:
+            _file_index.update(_load_file_index())
+        
+        current = {}
+        for filename in os.listdir(LOG_DIR):
+            if not filename.endswith('.jsonl'):
+                continue
+            stat = os.stat(os.path.join(LOG_DIR, filename))
+            cached = _file_index.get(filename)
+            if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                current[filename] = cached
+            else:
+                current[filename] = (stat.st_mtime_ns, stat.st_size, _contract_ids_in(filename))
+        
+        if current != _file_index:
+            _file_index.clear()
+            _file_index.update(current)
+            _save_file_index(current)
+        
+        return sorted(name for name, (_, _, ids) in current.items() if contract_id in ids)
+
+def _contract_ids_in(filename: str) -> Set[str]:
+    """Contract ids in one log file, found with a regex over the mapped file (no JSON parsing)"""
+    filepath = os.path.join(LOG_DIR, filename)
+    try:
+        with open(filepath, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return set()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return {m.decode('utf-8') for m in _CONTRACT_ID_RE.findall(mm)}
+    except OSError as e:
+        print(f"Failed to index log file {filename}: {e}")
+        return set()
+
+def _load_file_index() -> Dict[str, Tuple[int, int, Set[str]]]:
+    try:
+        with open(FILE_INDEX_PATH, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return {}
+
+def _save_file_index(index: Dict[str, Tuple[int, int, Set[str]]]):
+    try:
+        tmp_path = f'{FILE_INDEX_PATH}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, FILE_INDEX_PATH)
+    except OSError as e:
+        print(f"Failed to save log file index: {e}")
+
+def _log_writer():
+    """Drain the queue, writing up to WRITE_BATCH_SIZE entries at a time"""
+    conn = None
+    try:
+        conn = _open_index()
+    except Exception as e:
+        print(f"Audit index unavailable: {e}")
+    
+    # The queue this thread was started for; a forked child replaces the global
+    log_queue = _log_queue
+    while True:
+        batch = [log_queue.get()]
+        while len(batch) < WRITE_BATCH_SIZE:
+            try:
+                batch.append(log_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        # One unserializable entry (e.g. odd metadata) must not drop the rest of the batch
+        entries, lines = [], []
+        for entry in batch:
             try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        entry = json.loads(line.strip())
-                        if entry.get('contract_id') == contract_id:
-                            history.append(entry)
+                lines.append(orjson.dumps(entry, option=_DUMPS_OPTIONS))
+                entries.append(entry)
             except Exception as e:
-                print(f"Failed to read log file {filename}: {e}")
+                print(f"Failed to log action: {e}")
+        
+        try:
+            if entries:
+                _append_to_files(entries, lines)
+                indexed = False
+                if conn is not None:
+                    try:
+                        _index_entries(conn, entries, lines)
+                        indexed = True
+                    except sqlite3.Error as e:
+                        print(f"Audit index write failed: {e}")
+                if not indexed:
+                    _mark_index_stale()
+        except Exception as e:
+            print(f"Failed to log action: {e}")
+        finally:
+            for _ in batch:
+                log_queue.task_done()
+
+def _append_to_files(batch: List[Dict], lines: List[bytes]):
+    """Append entries to their daily log files, one open per file"""
+    os.makedirs(LOG_DIR, exist_ok=True)
     
-    return sorted(history, key=lambda x: x['timestamp'])
+    by_file: Dict[str, List[bytes]] = {}
+    for entry, line in zip(batch, lines):
+        # Append to daily log file
+        date_str = entry['timestamp'][:10]
+        log_file = os.path.join(LOG_DIR, f'audit_{date_str}.jsonl')
+        by_file.setdefault(log_file, []).append(line + b'\n')
+    
+    for log_file, file_lines in by_file.items():
+        with open(log_file, 'ab') as f:
+            f.writelines(file_lines)
+
+def _mark_index_stale():
+    """Send history lookups to the log files until the index is rebuilt"""
+    try:
+        with open(STALE_MARKER_PATH, 'a'):
+            pass
+    except OSError as e:
+        print(f"Failed to mark audit index stale: {e}")
+
+def _index_entries(conn: sqlite3.Connection, batch: List[Dict], lines: List[bytes]):
+    with conn:
+        conn.executemany(
+            'INSERT INTO entries (timestamp, contract_id, action, entry) VALUES (?, ?, ?, ?)',
+            [(entry['timestamp'], entry['contract_id'], entry['action'], line.decode('utf-8'))
+             for entry, line in zip(batch, lines)]
+        )
+
+def _open_index() -> sqlite3.Connection:
+    """
+    Open (creating if needed) the contract index
+
+    Existing log files are imported once, and again (replacing the index) when a
+    writer has marked the index stale.
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    conn = sqlite3.connect(INDEX_PATH, timeout=30, isolation_level=None)
+    
+    # Exclusive so concurrent worker processes do not import the backlog twice
+    conn.execute('BEGIN IMMEDIATE')
+    rebuilding = False
+    try:
+        conn.execute('CREATE TABLE IF NOT EXISTS entries (timestamp TEXT, contract_id TEXT, action TEXT, entry TEXT)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_cid ON entries(contract_id)')
+        conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        
+        backfill = conn.execute("SELECT 1 FROM meta WHERE key = 'backfilled'").fetchone() is None
+        if os.path.exists(STALE_MARKER_PATH):
+            # Removed before the files are read, so a failure from here on marks it again
+            os.remove(STALE_MARKER_PATH)
+            rebuilding = True
+            conn.execute('DELETE FROM entries')
+            backfill = True
+        
+        if backfill:
+            for filename in sorted(os.listdir(LOG_DIR)):
+                if filename.endswith('.jsonl'):
+                    _import_log_file(conn, os.path.join(LOG_DIR, filename))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('backfilled', ?)", (datetime.now().isoformat(),))
+        
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        conn.close()
+        if rebuilding:
+            _mark_index_stale()
+        raise
+    
+    conn.isolation_level = ''
+    return conn
+
+def _import_log_file(conn: sqlite3.Connection, filepath: str):
+    rows = []
+    with open(filepath, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = orjson.loads(line)
+            except ValueError:
+                continue
+            rows.append((entry.get('timestamp', ''), entry.get('contract_id'), entry.get('action'), line.decode('utf-8')))
+    conn.executemany('INSERT INTO entries (timestamp, contract_id, action, entry) VALUES (?, ?, ?, ?)', rows)
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+# Write out anything still queued when the process exits
+atexit.register(flush)
@@ -0,0 +1,54 @@
+"""
+Contract Store - Keep each upload's extracted text on disk so it can be analyzed by contract_id
+"""
+from typing import Optional
+import os
+import uuid
+
+from ..nlp.parsers.document_parser import DocumentParser
+
+UPLOAD_DIR = 'data/uploads'
+
+UPLOAD_EXTENSIONS = ('pdf', 'docx', 'txt')
+
+def text_path(contract_id: str) -> str:
+    return os.path.join(UPLOAD_DIR, f"{contract_id}_text.txt")
+
+def save_text(contract_id: str, text: str):
+    """Write the extracted text next to the uploaded file"""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    with open(text_path(contract_id), 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def load_text(contract_id: str) -> Optional[str]:
+    """
+    Extracted text of an uploaded contract
+
+    PDFs uploaded with ?preview_only=1 have no saved text yet; their file is
+    parsed in full here and the text saved for next time.
+
+    Returns:
+        The text, or None if no contract was uploaded with this id
+    """
+    # Contract ids are server-generated UUIDs; anything else would be a path
+    try:
+        uuid.UUID(contract_id)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+    try:
+        with open(text_path(contract_id), 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    for file_extension in UPLOAD_EXTENSIONS:
+        filepath = os.path.join(UPLOAD_DIR, f"{contract_id}.{file_extension}")
+        if os.path.exists(filepath):
+            parsed_data = DocumentParser().parse(filepath, file_extension)
+            if not parsed_data['success']:
+                return None
+            save_text(contract_id, parsed_data['text'])
+            return parsed_data['text']
+
+    return None
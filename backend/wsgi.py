@@ -0,0 +1,7 @@
+"""
+WSGI entrypoint - Serve the Flask app with Gunicorn
+
+Run from the project root:
+    gunicorn -k gthread --workers $(nproc) --threads 16 --timeout 120 backend.wsgi:app
+"""
+from .app import app
@@ -58,7 +58,7 @@ async function handleFile(file) {
 
     try {
         // Step 1: Upload
-        const uploadRes = await fetch(`${API_BASE}/upload/`, {
+        const uploadRes = await fetch(`${API_BASE}/upload/?preview_only=1`, {
             method: 'POST',
             body: formData
         });
@@ -67,7 +67,6 @@ async function handleFile(file) {
         const uploadData = await uploadRes.json();
 
         currentContractId = uploadData.contract_id;
-        const text = uploadData.text;
 
         // Step 2: Analyze
         document.getElementById('loading-text').innerText = "Analyzing clauses and risks (AI)...";
@@ -76,8 +75,7 @@ async function handleFile(file) {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
-                contract_id: currentContractId,
-                text: text
+                contract_id: currentContractId  // the server analyzes the uploaded file's text
             })
         });
 
@@ -0,0 +1,45 @@
+"""
+Shared test configuration
+"""
+import pytest
+
+@pytest.fixture(scope="session")
+def clause_extractor():
+    """One ClauseExtractor for every test; building it compiles the category automata"""
+    from backend.nlp.extractors.clause_extractor import ClauseExtractor
+    return ClauseExtractor()
+
+# English, Hindi and mixed clauses, plus ones that only match their keywords after
+# NFKC normalization (fullwidth letters, ligatures, non-breaking spaces)
+_MIXED_CLAUSES = [
+    "The Employee shall not disclose any Confidential Information.",
+    "The Company may terminate this agreement at any time without cause.",
+    "The Vendor shall indemnify against all losses and accepts unlimited liability.",
+    "This agreement will automatically renew for a further term of one year.",
+    "Disputes are subject to the exclusive jurisdiction of the courts of Singapore.",
+    "The Supplier accepts unlimited liability and the exclusive jurisdiction of the courts of London.",
+    "The Consultant will use best efforts to deliver as soon as possible.",
+    '"Services" means the work described in Schedule A.',
+    "This agreement is between the parties named above.",
+    "ग्राहक को 30 दिनों के भीतर भुगतान करना होगा।",
+    "कर्मचारी को छुट्टी का अधिकार है।",
+    "कर्मचारी गोपनीय जानकारी साझा नहीं करेगा।",
+    "यदि भुगतान में देरी होती है तो penalty लागू होगी।",
+    "यह समझौता दोनों पक्षों के बीच है।",
+    "The Employee ｓｈａｌｌ ｎｏｔ compete after termination.",
+    "Payment of the fees is subject to prior approval.",
+    "The deﬁnition of Deliverables is set out in Annex 2.",
+    "Arbitration in London under ＩＣＣ Rules is final.",
+]
+
+_CLAUSE_CONTEXTS = [
+    "{}",
+    "Notwithstanding the above, {}",
+    "{} This survives expiry.",
+    "  {}\n",
+]
+
+@pytest.fixture(scope="session")
+def mixed_clause_texts():
+    """More clause texts than BATCH_SCAN_MIN_CLAUSES, so batch APIs take their compiled scan path"""
+    return [context.format(clause) for context in _CLAUSE_CONTEXTS for clause in _MIXED_CLAUSES]
@@ -2,8 +2,14 @@
 Test Entity Extraction
 """
 import pytest
+import spacy
+from backend.nlp._registry import SPACY_MODEL
 from backend.nlp.extractors.entity_extractor import EntityExtractor
 
+requires_spacy_model = pytest.mark.skipif(
+    not spacy.util.is_package(SPACY_MODEL), reason=f"{SPACY_MODEL} is not installed"
+)
+
 def test_party_extraction():
     """Test extraction of parties from contract text"""
     extractor = EntityExtractor()
@@ -64,3 +70,45 @@ def test_jurisdiction_extraction():
     
     # Check that jurisdiction is extracted
     assert len(entities['jurisdiction']) > 0
+
+@requires_spacy_model
+def test_extract_many_matches_extract():
+    """Test that batched extraction returns the same entities as per-text extraction"""
+    extractor = EntityExtractor()
+    
+    texts = [
+        "The monthly salary shall be Rs. 50,000 payable within 30 days.",
+        "This agreement shall be governed by the laws of India.",
+        ""
+    ]
+    
+    assert extractor.extract_many(texts) == [extractor.extract(t) for t in texts]
+
+def test_extract_many_matches_extract_regex_fields():
+    """Test batched extraction of the regex-based fields, without the NER model"""
+    extractor = EntityExtractor(spacy.blank('en'))
+    
+    texts = [
+        "This agreement shall be governed by the laws of India.",
+        "The lock-in period is 2 years and either party may leave with 30 days notice.",
+        "Any disputes shall be subject to the jurisdiction of courts in Mumbai within 6 months.",
+        "",
+        "The lock-in period is 2 years and either party may leave with 30 days notice."
+    ]
+    
+    batched = extractor.extract_many(texts)
+    assert batched == [extractor.extract(t) for t in texts]
+    
+    assert batched[0]['jurisdiction'] and not batched[0]['durations']
+    assert {d['text'].lower() for d in batched[1]['durations']} >= {'2 years', '30 days'}
+    assert batched[2]['jurisdiction'] and batched[2]['durations']
+    assert all(not bucket for bucket in batched[3].values())
+
+def test_large_duration_value():
+    """Test that a duration too large for a fixed-width integer keeps its exact value"""
+    extractor = EntityExtractor(spacy.blank('en'))
+    
+    entities = extractor.extract("The licence is granted for 99999999999 days.")
+    
+    assert [(d['value'], d['unit']) for d in entities['durations']] == [(99999999999, 'day')]
+    assert type(entities['durations'][0]['value']) is int
@@ -1,25 +1,74 @@
 import unittest
 import sys
 import os
+import pytest
+import spacy
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.nlp._registry import SIMILARITY_ONNX_MODEL, SPACY_MODEL
 from backend.nlp.extractors.clause_extractor import ClauseExtractor
 from backend.nlp.similarity import ClauseSimilarity
 
+# Similarity needs the spaCy word vectors or a configured sentence encoder
+requires_similarity_model = pytest.mark.skipif(
+    not (SIMILARITY_ONNX_MODEL or spacy.util.is_package(SPACY_MODEL)),
+    reason=f"{SPACY_MODEL} is not installed and SIMILARITY_ONNX_MODEL is not set"
+)
+
+CLASSIFY_CASES = [
+    ("ग्राहक को 30 दिनों के भीतर भुगतान करना होगा।", 'obligation'),  # "Customer must pay within 30 days"
+    ("कर्मचारी को छुट्टी का अधिकार है।", 'right'),  # "Employee has right to leave"
+    ("कर्मचारी गोपनीय जानकारी साझा नहीं करेगा।", 'prohibition'),  # "Employee shall not share confidential information"
+    ("The Employee shall not disclose any Confidential Information.", 'prohibition'),
+    ("The Company may terminate this agreement.", 'right'),
+    ("This agreement is between the parties.", 'general'),
+]
+
+@pytest.mark.parametrize("text, expected", CLASSIFY_CASES)
+def test_hindi_clause_extraction(clause_extractor, text, expected):
+    assert clause_extractor._classify_clause(text) == expected
+
+def test_classify_batch(clause_extractor):
+    texts = [text for text, _ in CLASSIFY_CASES]
+    assert clause_extractor.classify_batch(texts) == [expected for _, expected in CLASSIFY_CASES]
+    assert clause_extractor.classify_batch([]) == []
+
+def test_classify_batch_matches_single(clause_extractor, mixed_clause_texts):
+    assert len(mixed_clause_texts) >= clause_extractor.BATCH_SCAN_MIN_CLAUSES
+    
+    batched = clause_extractor.classify_batch(mixed_clause_texts)
+    assert len(batched) == len(mixed_clause_texts)
+    for text, clause_type in zip(mixed_clause_texts, batched):
+        assert clause_type == clause_extractor._classify_clause(text), text
+    assert {'prohibition', 'obligation', 'right', 'condition', 'definition', 'general'} <= set(batched)
+    
+    # A lone surrogate (allowed by JSON "\ud800") must not break the compiled scan
+    with_surrogates = [text + '\ud800' for text in mixed_clause_texts]
+    assert clause_extractor.classify_batch(with_surrogates) == batched
+
 class TestNewFeatures(unittest.TestCase):
-    def test_hindi_clause_extraction(self):
-        extractor = ClauseExtractor()
-        # Test Hindi text
-        hindi_text = "ग्राहक को 30 दिनों के भीतर भुगतान करना होगा।" # "Customer must pay within 30 days"
-        self.assertEqual(extractor._classify_clause(hindi_text), 'obligation')
+    @classmethod
+    def setUpClass(cls):
+        # Shared by every test; each loads keyword tables and the spaCy model
+        cls.extractor = ClauseExtractor()
+        cls.sim = ClauseSimilarity()
+    
+    def test_mixed_language_clause_types(self):
+        # Hindi and English clauses of one contract are classified in the same scan
+        text = (
+            "The Employee shall not disclose any confidential information.\n\n"
+            "ग्राहक को 30 दिनों के भीतर भुगतान करना होगा।\n\n"
+            "The Employee may take leave with prior notice.\n\n"
+            "यह समझौता दोनों पक्षों के बीच है।"
+        )
+        types = [clause.type for clause in self.extractor.extract(text)]
+        self.assertEqual(types, ['prohibition', 'obligation', 'right', 'general'])
         
-        hindi_right = "कर्मचारी को छुट्टी का अधिकार है।" # "Employee has right to leave"
-        self.assertEqual(extractor._classify_clause(hindi_right), 'right')
+        for clause in self.extractor.extract(text):
+            self.assertEqual(clause.type, self.extractor._classify_clause(clause.text))
         
+    @requires_similarity_model
     def test_clause_similarity(self):
-        sim = ClauseSimilarity()
-        if not sim.nlp:
-            print("Skipping similarity test - spacy model not loaded")
-            return
+        sim = self.sim
             
         std_clause = "The Employee agrees not to disclose any Confidential Information."
         similar_clause = "The Worker shall not reveal any Secret Data."
@@ -32,6 +81,46 @@ class TestNewFeatures(unittest.TestCase):
         print(f"Different Score: {result_diff['match_score']}")
         
         self.assertTrue(result_sim['match_score'] > result_diff['match_score'])
+    
+    @requires_similarity_model
+    def test_clause_similarity_multiple_standards(self):
+        sim = self.sim
+        
+        standards = [
+            "The weather is nice today.",
+            "The Employee agrees not to disclose any Confidential Information.",
+            "Salary shall be paid on the last working day of each month."
+        ]
+        clauses = [
+            "The Worker shall not reveal any Secret Data.",
+            "Wages are paid at the end of every month.",
+            ""
+        ]
+        
+        result = sim.compare_to_standard(clauses[0], standards)
+        self.assertIn(result['best_match_text'], standards)
+        
+        # Batched comparison gives the same result as one clause at a time
+        batched = sim.compare_many(clauses, standards)
+        for clause, batch_result in zip(clauses, batched):
+            single = sim.compare_to_standard(clause, standards)
+            self.assertEqual(batch_result['best_match_text'], single['best_match_text'])
+            self.assertAlmostEqual(batch_result['match_score'], single['match_score'], places=5)
+        self.assertEqual(batched[2]['match_score'], 0)
+    
+    @requires_similarity_model
+    def test_int8_standards_match_float32(self):
+        sim = self.sim
+        sim_int8 = ClauseSimilarity(sim.nlp, int8_standards=True)
+        
+        standards = [
+            "The Employee agrees not to disclose any Confidential Information.",
+            "Salary shall be paid on the last working day of each month."
+        ]
+        clauses = ["The Worker shall not reveal any Secret Data.", "The weather is nice today."]
+        
+        for exact, quantized in zip(sim.compare_many(clauses, standards), sim_int8.compare_many(clauses, standards)):
+            self.assertAlmostEqual(exact['match_score'], quantized['match_score'], delta=0.01)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,70 @@
+"""
+Test the Analysis Pipeline
+"""
+import hashlib
+import threading
+
+import numpy as np
+import pytest
+import spacy
+from backend import pipeline
+from backend.nlp.extractors.entity_extractor import EntityExtractor
+from backend.nlp.similarity import ClauseSimilarity
+
+STANDARD_CLAUSES = [
+    "The Employee shall not disclose any Confidential Information.",
+    "Salary shall be paid on the last working day of each month.",
+    "Either party may terminate this agreement with 30 days notice."
+]
+
+class _HashEncoder:
+    """Stands in for SentenceEncoder: deterministic word-hash embeddings, recording the calling thread"""
+
+    def __init__(self):
+        self.threads = []
+
+    def encode(self, texts, batch_size=64):
+        self.threads.append(threading.current_thread().name)
+        vectors = np.zeros((len(texts), 64), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[i, hashlib.blake2b(word.encode('utf-8'), digest_size=1).digest()[0] % 64] += 1
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1)
+
+@pytest.fixture
+def encoder_pipeline(monkeypatch):
+    """run_analysis with encoder similarity and no spaCy model, template or audit log"""
+    encoder = _HashEncoder()
+    monkeypatch.delenv('GROQ_API_KEY', raising=False)
+    monkeypatch.setattr(pipeline, 'get_similarity', lambda: ClauseSimilarity(encoder=encoder))
+    monkeypatch.setattr(pipeline, 'get_entity_extractor', lambda: EntityExtractor(spacy.blank('en')))
+    monkeypatch.setattr(pipeline, 'load_template', lambda contract_type: {'clauses': STANDARD_CLAUSES})
+    monkeypatch.setattr(pipeline, 'log_action', lambda *args, **kwargs: None)
+    return encoder
+
+def _contract(n_clauses):
+    clauses = [
+        "The Employee must not disclose Confidential Information to anyone.",
+        "Salary will be paid on the last working day of every month.",
+        "The Company may terminate this agreement with 30 days notice.",
+        "This agreement is governed by the laws of India."
+    ]
+    return "\n\n".join(f"{clauses[i % len(clauses)]} (Clause {i + 1})" for i in range(n_clauses))
+
+@pytest.mark.parametrize('n_clauses, threaded', [(pipeline.OVERLAP_MIN_CLAUSES, True), (3, False)])
+def test_similarity_overlaps_ner_with_encoder(encoder_pipeline, n_clauses, threaded):
+    result = pipeline.run_analysis('contract-1', _contract(n_clauses))
+
+    assert len(result['clauses']) == n_clauses
+    on_worker = [name.startswith('clause-similarity') for name in encoder_pipeline.threads]
+    assert on_worker and all(on_worker) == threaded and any(on_worker) == threaded
+
+    # The threaded path attaches the same results as comparing directly
+    expected = ClauseSimilarity(encoder=_HashEncoder()).compare_many(
+        [clause['text'] for clause in result['clauses']], STANDARD_CLAUSES
+    )
+    for clause, sim_result in zip(result['clauses'], expected):
+        assert clause['similarity_score'] == pytest.approx(sim_result['match_score'])
+        assert clause['is_standard'] == sim_result['is_standard']
+        assert clause['deviation_flag'] == sim_result['is_deviant']
@@ -4,10 +4,13 @@ Test Risk Scoring Logic
 import pytest
 from backend.llm.risk_scorer import RiskScorer
 
-def test_high_risk_detection():
+@pytest.fixture(scope="module")
+def scorer():
+    """One RiskScorer for the whole module; building it compiles every keyword matcher"""
+    return RiskScorer()
+
+def test_high_risk_detection(scorer):
     """Test detection of high-risk clauses"""
-    scorer = RiskScorer()
-    
     clause = """
     The Company may terminate this agreement at any time without cause
     and without notice. The Employee shall have unlimited liability
@@ -20,10 +23,8 @@ def test_high_risk_detection():
     assert result['score'] >= 70
     assert len(result['flags']) > 0
 
-def test_low_risk_detection():
+def test_low_risk_detection(scorer):
     """Test detection of low-risk clauses"""
-    scorer = RiskScorer()
-    
     clause = """
     The parties agree to maintain confidentiality of proprietary information
     disclosed during the term of this agreement.
@@ -34,10 +35,8 @@ def test_low_risk_detection():
     assert result['level'] == 'low'
     assert result['score'] < 40
 
-def test_composite_score():
+def test_composite_score(scorer):
     """Test composite contract risk scoring"""
-    scorer = RiskScorer()
-    
     clauses = [
         {'text': 'Standard payment terms apply.', 'type': 'obligation'},
         {'text': 'Party may terminate without cause.', 'type': 'prohibition'},
@@ -50,3 +49,23 @@ def test_composite_score():
     assert 'risk_level' in result
     assert result['risk_level'] in ['low', 'medium', 'high']
     assert 0 <= result['composite_score'] <= 100
+
+def test_batch_scoring_matches_single(scorer, mixed_clause_texts):
+    """score_clauses and score_contract agree with score_clause clause by clause"""
+    assert len(mixed_clause_texts) >= scorer.BATCH_SCAN_MIN_CLAUSES
+    
+    single = [scorer.score_clause(text, 'service') for text in mixed_clause_texts]
+    batched = scorer.score_clauses([{'text': text} for text in mixed_clause_texts], 'service')
+    assert batched == single
+    assert scorer.score_clauses([{'text': text + '\ud800'} for text in mixed_clause_texts], 'service') == single
+    assert {result['level'] for result in single} == {'low', 'medium', 'high'}
+    
+    clauses = [{'text': text} for text in mixed_clause_texts]
+    result = scorer.score_contract('service', clauses)
+    for clause, expected in zip(clauses, single):
+        assert clause['risk_score'] == expected['score']
+        assert clause['risk_level'] == expected['level']
+    
+    mean = sum(expected['score'] for expected in single) / len(single)
+    assert result['composite_score'] == round(mean, 2)
+    assert result['high_risk_clauses'] == sum(1 for expected in single if expected['level'] == 'high')
@@ -0,0 +1,141 @@
+"""
+Test Audit Logging and History Lookup
+"""
+import os
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+
+import orjson
+import pytest
+from backend.utils import audit_logger
+
+@pytest.fixture(params=['sqlite', 'file_scan'])
+def lookup(request):
+    """History lookup under test: the SQLite index, or the log file scan used when it cannot be opened"""
+    return request.param
+
+@pytest.fixture
+def audit_log(lookup, tmp_path, monkeypatch):
+    """The audit logger writing under tmp_path, with a fresh queue and writer thread"""
+    log_dir = str(tmp_path / 'audit_logs')
+    monkeypatch.setattr(audit_logger, 'LOG_DIR', log_dir)
+    monkeypatch.setattr(audit_logger, 'INDEX_PATH', os.path.join(log_dir, 'index.sqlite'))
+    monkeypatch.setattr(audit_logger, 'FILE_INDEX_PATH', os.path.join(log_dir, '.index.pickle'))
+    monkeypatch.setattr(audit_logger, 'STALE_MARKER_PATH', os.path.join(log_dir, '.index_stale'))
+    monkeypatch.setattr(audit_logger, '_log_queue', queue.Queue())
+    monkeypatch.setattr(audit_logger, '_writer', None)
+    monkeypatch.setattr(audit_logger, '_file_index', {})
+
+    if lookup == 'file_scan':
+        def unavailable():
+            raise sqlite3.OperationalError('unable to open database file')
+        monkeypatch.setattr(audit_logger, '_open_index', unavailable)
+
+    yield audit_logger
+
+    # Nothing may be left in flight when the paths are restored
+    audit_logger.flush()
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Timestamps for the next log_action calls, in order
+
+    Only calls from the test's thread are scripted; the writer thread keeps the real clock.
+    """
+    times = []
+    owner = threading.get_ident()
+
+    class ScriptedDatetime:
+        @staticmethod
+        def now():
+            if threading.get_ident() == owner and times:
+                return datetime.fromisoformat(times.pop(0))
+            return datetime.now()
+
+    monkeypatch.setattr(audit_logger, 'datetime', ScriptedDatetime)
+    return times
+
+def _restart_writer(monkeypatch, open_index=None):
+    """Stand-in for another worker process: a new queue and writer, optionally with a failing index"""
+    monkeypatch.setattr(audit_logger, '_log_queue', queue.Queue())
+    monkeypatch.setattr(audit_logger, '_writer', None)
+    if open_index is not None:
+        monkeypatch.setattr(audit_logger, '_open_index', open_index)
+
+def _entry(timestamp, contract_id, action):
+    return {'timestamp': timestamp, 'contract_id': contract_id, 'action': action, 'metadata': {}}
+
+def test_history_is_ordered_by_timestamp(audit_log, clock, lookup):
+    # Logged out of order, and across two daily files
+    clock.extend(['2026-01-02T10:00:00', '2026-01-01T12:00:00', '2026-01-01T09:00:00'])
+    audit_log.log_action('c1', 'analyze')
+    audit_log.log_action('c2', 'upload', {'source': {'contract_id': 'c1'}})
+    audit_log.log_action('c1', 'upload', {'filename': 'nda.pdf'})
+    audit_log.flush()
+
+    assert {'audit_2026-01-01.jsonl', 'audit_2026-01-02.jsonl'} <= set(os.listdir(audit_log.LOG_DIR))
+    assert os.path.exists(audit_log.INDEX_PATH) == (lookup == 'sqlite')
+
+    history = audit_log.get_contract_history('c1')
+    assert [(e['timestamp'], e['action']) for e in history] == [
+        ('2026-01-01T09:00:00', 'upload'),
+        ('2026-01-02T10:00:00', 'analyze')
+    ]
+    assert history[0]['metadata'] == {'filename': 'nda.pdf'}
+
+    # A contract id inside another entry's metadata is not a match
+    assert [e['action'] for e in audit_log.get_contract_history('c2')] == ['upload']
+    assert audit_log.get_contract_history('missing') == []
+
+def test_corrupt_line_mid_file_is_skipped(audit_log, clock):
+    # Written before the writer starts, so the SQLite path imports it in the backfill
+    os.makedirs(audit_log.LOG_DIR)
+    lines = [
+        orjson.dumps(_entry('2026-01-01T08:00:00', 'c1', 'upload')),
+        b'{"timestamp": "2026-01-01T08:30:00", "contract_id": "c1", "act',
+        orjson.dumps(_entry('2026-01-01T09:00:00', 'c1', 'analyze')),
+    ]
+    with open(os.path.join(audit_log.LOG_DIR, 'audit_2026-01-01.jsonl'), 'wb') as f:
+        f.write(b'\n'.join(lines) + b'\n')
+
+    clock.append('2026-01-01T10:00:00')
+    audit_log.log_action('c1', 'export')
+    audit_log.flush()
+
+    history = audit_log.get_contract_history('c1')
+    assert [e['action'] for e in history] == ['upload', 'analyze', 'export']
+
+@pytest.mark.parametrize('lookup', ['sqlite'])
+def test_entries_from_unindexed_writer_are_not_lost(audit_log, clock, monkeypatch):
+    clock.extend(['2026-01-01T08:00:00', '2026-01-01T09:00:00', '2026-01-01T10:00:00'])
+    audit_log.log_action('c1', 'upload')
+    audit_log.flush()
+    assert os.path.exists(audit_log.INDEX_PATH)
+    
+    # A worker whose index could not be opened (e.g. a lock timeout) writes only the log file
+    open_index = audit_log._open_index
+    def locked():
+        raise sqlite3.OperationalError('database is locked')
+    _restart_writer(monkeypatch, locked)
+    audit_log.log_action('c1', 'analyze')
+    audit_log.flush()
+    
+    assert os.path.exists(audit_log.STALE_MARKER_PATH)
+    assert [e['action'] for e in audit_log.get_contract_history('c1')] == ['upload', 'analyze']
+    
+    # The next writer to open the index rebuilds it from the log files
+    _restart_writer(monkeypatch, open_index)
+    audit_log.log_action('c1', 'export')
+    audit_log.flush()
+    
+    assert not os.path.exists(audit_log.STALE_MARKER_PATH)
+    with sqlite3.connect(audit_log.INDEX_PATH) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0] == 3
+    assert [e['action'] for e in audit_log.get_contract_history('c1')] == ['upload', 'analyze', 'export']
+
+def test_flush_without_entries_starts_no_writer(audit_log):
+    audit_log.flush()
+    assert audit_log._writer is None